@@ -0,0 +1,158 @@
+import numpy as np
+import pandas as pd
+from sales_aggregates import extends_table, revenue_tables
+from sales_cube import REFRESH_SECONDS, load_versioned
+
+# Each day is compared with the same weekday of the last WINDOW weeks
+WINDOW = 8
+# Same-weekday days seen before a series' days are scored
+MIN_HISTORY = 4
+# Robust z-score beyond which a day is flagged
+THRESHOLD = 3.5
+# Scales MAD to the standard deviation of normally distributed data
+MAD_SCALE = 1.4826
+# Lower bounds on the spread, so a series that barely moves (or is mostly
+# zero) is not flagged for every small change: a share of the typical day's
+# revenue, and about one sale.
+MIN_SCALE_FRACTION = 0.1
+MIN_SCALE = 25.0
+
+TOTAL_SERIES = "All coffee types"
+FLAG_COLUMNS = ["Date", "series", "revenue", "expected", "score"]
+
+
+class WeekdayBaseline:
+    """Rolling same-weekday median and MAD of a batch of series, fed one day at a time.
+
+    The last WINDOW values of each weekday are kept in a ring buffer of
+    shape (weekday, WINDOW, series), so scoring a day is one median over
+    WINDOW rows for all series at once and no earlier day is read again.
+    All series share their dates, so the ring positions are shared too.
+    """
+
+    def __init__(self, n_series: int, first_weekday: int):
+        self.first_weekday = first_weekday
+        self.buffer = np.full((7, WINDOW, n_series), np.nan)
+        self.seen = np.zeros(7, dtype=np.int64)
+        self.steps = 0
+        # Flagged (day, series, value, expected, score) arrays, one entry per scored day
+        self.flags = []
+
+    def copy(self) -> "WeekdayBaseline":
+        state = object.__new__(WeekdayBaseline)
+        state.__dict__.update(self.__dict__)
+        state.buffer = self.buffer.copy()
+        state.seen = self.seen.copy()
+        state.flags = list(self.flags)
+        return state
+
+    def update(self, values: np.ndarray) -> None:
+        """Score, then remember, the next days in ``values`` (series, steps)."""
+        for observed in values.T:
+            weekday = (self.first_weekday + self.steps) % 7
+            history = self.buffer[weekday]
+            if self.seen[weekday] >= MIN_HISTORY:
+                median = np.median if self.seen[weekday] >= WINDOW else np.nanmedian
+                expected = median(history, axis=0)
+                mad = median(np.abs(history - expected), axis=0)
+                scale = np.maximum(MAD_SCALE * mad, np.maximum(MIN_SCALE_FRACTION * np.abs(expected), MIN_SCALE))
+                score = (observed - expected) / scale
+                series = np.flatnonzero(np.abs(score) > THRESHOLD)
+                if len(series):
+                    self.flags.append((
+                        np.full(len(series), self.steps), series,
+                        observed[series], expected[series], score[series],
+                    ))
+            history[self.seen[weekday] % WINDOW] = observed
+            self.seen[weekday] += 1
+            self.steps += 1
+
+
+class SeriesAnomalies:
+    """Flagged days of the columns of a daily revenue table.
+
+    As with SeriesForecast, the last day may still change, so the baseline
+    is also kept as of the day before it; with a ``base`` fit on a table
+    that the new one only extends past that checkpoint, only the new days
+    are scored. With ``score_last`` False the last day is left unscored,
+    since its revenue is still incomplete.
+    """
+
+    def __init__(self, table: pd.DataFrame, base: "SeriesAnomalies | None" = None, score_last: bool = True):
+        self.table = table
+        values = table.to_numpy(dtype=np.float64).T
+        checkpoint = len(table) - 1
+
+        resume = base is not None and base.resumable(table)
+        if resume:
+            state = base._checkpoint.copy()
+            state.update(values[:, base._checkpoint.steps:checkpoint])
+        else:
+            state = WeekdayBaseline(len(values), table.index[0].dayofweek)
+            state.update(values[:, :checkpoint])
+        self.resumed = resume
+        self._checkpoint = state
+        state = state.copy()
+        if score_last:
+            state.update(values[:, checkpoint:])
+        self.flags = self._flag_table(state.flags)
+
+    def resumable(self, table: pd.DataFrame) -> bool:
+        """Whether ``table`` only changes or adds rows after this fit's checkpoint."""
+        return extends_table(table, self.table, self._checkpoint.steps)
+
+    def _flag_table(self, flags: list) -> pd.DataFrame:
+        if not flags:
+            return pd.DataFrame({
+                "Date": pd.Series(dtype="datetime64[ns]"),
+                "series": pd.Categorical([], categories=self.table.columns),
+                "revenue": pd.Series(dtype=float),
+                "expected": pd.Series(dtype=float),
+                "score": pd.Series(dtype=float),
+            })
+        day, series, revenue, expected, score = (np.concatenate(parts) for parts in zip(*flags))
+        return pd.DataFrame({
+            "Date": self.table.index[day],
+            "series": pd.Categorical.from_codes(series, categories=self.table.columns),
+            "revenue": revenue,
+            "expected": expected,
+            "score": score,
+        })
+
+
+class RevenueAnomalies:
+    """Spikes and dips in daily revenue, in total and per coffee type.
+
+    ``flags`` has one row per flagged (Date, series) with the day's
+    ``revenue``, the ``expected`` (same-weekday median) revenue and the
+    robust ``score``: positive for spikes, negative for dips. With
+    ``base``, only the days after base's checkpoint are scored.
+    """
+
+    def __init__(self, cube: pd.DataFrame, version: str, base: "RevenueAnomalies | None" = None):
+        self.version = version
+        daily, _ = revenue_tables(cube)
+        daily.insert(0, TOTAL_SERIES, daily.sum(axis=1))
+        # While sales are still coming in live, today is incomplete
+        self.series = SeriesAnomalies(daily, base.series if base is not None else None, score_last=not REFRESH_SECONDS)
+        self.flags = self.series.flags
+        self.coffee_types = list(daily.columns[1:])
+
+    def flagged(self, series, date_range) -> pd.DataFrame:
+        """Return the flags of ``series`` (a name or list of names) between the two dates of ``date_range``."""
+        names = [series] if isinstance(series, str) else list(series)
+        dates = self.flags["Date"]
+        mask = (
+            self.flags["series"].isin(names)
+            & (dates >= pd.Timestamp(date_range[0]))
+            & (dates <= pd.Timestamp(date_range[1]))
+        )
+        return self.flags[mask].reset_index(drop=True)
+
+
+def load_anomalies(version: str | None = None) -> RevenueAnomalies:
+    """Return the revenue anomalies for ``version`` (default: the current data), found once per version.
+
+    The result is shared between sessions and must not be mutated.
+    """
+    return load_versioned("anomalies", RevenueAnomalies, version)
@@ -0,0 +1,65 @@
+"""Per-filter latency of SalesFilter versus the previous chained pandas filter.
+
+Run from the repository root:
+
+    python streamlit_CS/benchmarks/bench_filters.py --sizes 10000 100000 1000000
+"""
+
+import argparse
+import datetime
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sales_filters import SalesFilter  # noqa: E402
+from synthetic import make_ledger  # noqa: E402
+
+
+def chained_filter(df, date_range, hour_range, coffees):
+    # The Dashboard's original approach: per-row date objects and one copy per step.
+    start_date, end_date = date_range
+    out = df.copy()
+    out = out[(out["Date"].dt.date >= start_date) & (out["Date"].dt.date <= end_date)]
+    start_hour, end_hour = hour_range
+    out = out[(out["hour_of_day"] >= start_hour) & (out["hour_of_day"] <= end_hour)]
+    return out[out["coffee_name"].isin(coffees)]
+
+
+def best_of(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'rows':>12} {'chained ms':>12} {'SalesFilter ms':>15} {'speedup':>8}")
+    for n_rows in args.sizes:
+        df = make_ledger(n_rows)
+        engine = SalesFilter(df)
+
+        first = df["Date"].iloc[0].date()
+        date_range = (first + datetime.timedelta(days=30), first + datetime.timedelta(days=120))
+        hour_range = (8, 14)
+        coffees = engine.coffee_types[:5]
+
+        old_s, old = best_of(lambda: chained_filter(df, date_range, hour_range, coffees), args.repeat)
+        new_s, new = best_of(lambda: engine.apply(date_range, hour_range, coffees), args.repeat)
+        assert np.array_equal(old.index.to_numpy(), new.index.to_numpy())
+
+        print(f"{n_rows:>12,} {old_s * 1e3:>12.2f} {new_s * 1e3:>15.2f} {old_s / new_s:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
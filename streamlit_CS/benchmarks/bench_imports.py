@@ -0,0 +1,96 @@
+"""Cold-start import budget for every page of the app.
+
+Each page's top-level imports are run in a fresh ``python -X importtime``
+process, with streamlit_CS on sys.path as when Streamlit runs the page.
+Reported per page: total import time, the slowest top-level packages and
+peak RSS after importing. The best of ``--repeat`` runs is kept. Exits
+with status 1 when a page goes over ``--max-ms`` or ``--max-rss-mb``, so
+it can gate CI.
+
+Run from the repository root:
+
+    python streamlit_CS/benchmarks/bench_imports.py --max-ms 2000 --max-rss-mb 180
+"""
+
+import argparse
+import ast
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent.parent
+PAGES = ["app.py", "pages/Bio.py", "pages/Dashboard.py", "pages/EDA_Gallery.py", "pages/Future_Work.py"]
+
+# Printed by the child process after the page's imports
+REPORT_RSS = "import resource; print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)"
+
+
+def page_imports(page: str) -> str:
+    """Return the module-level import statements of ``page`` as source code."""
+    tree = ast.parse((APP_DIR / page).read_text())
+    imports = [node for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+    return "\n".join(ast.unparse(node) for node in imports)
+
+
+def parse_importtime(stderr: str) -> dict[str, int]:
+    """Return {top-level module: cumulative microseconds} from ``-X importtime`` output."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Nested imports are indented under the module that triggered them
+        if not name[1:].startswith(" "):
+            modules[name.strip()] = int(cumulative)
+    return modules
+
+
+def measure(page: str) -> dict:
+    code = f"import sys\nsys.path.insert(0, {str(APP_DIR)!r})\n{page_imports(page)}\n{REPORT_RSS}"
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=APP_DIR,
+        capture_output=True,
+        text=True,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"importing {page} failed:\n{completed.stderr[-2000:]}")
+    modules = parse_importtime(completed.stderr)
+    return {
+        "page": page,
+        "import_ms": sum(modules.values()) / 1e3,
+        # ru_maxrss is in KiB on Linux
+        "rss_mb": int(completed.stdout.split()[-1]) / 1024,
+        "slowest": sorted(modules.items(), key=lambda item: -item[1])[:5],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", nargs="+", default=PAGES, choices=PAGES)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per page; the fastest is kept.")
+    parser.add_argument("--max-ms", type=float, default=2000, help="Import time budget per page.")
+    parser.add_argument("--max-rss-mb", type=float, default=180, help="RSS budget per page after importing.")
+    parser.add_argument("--json", type=Path, help="Also write the raw results to this file.")
+    args = parser.parse_args()
+
+    results, over_budget = [], []
+    for page in args.pages:
+        result = min((measure(page) for _ in range(args.repeat)), key=lambda r: r["import_ms"])
+        results.append(result)
+
+        slowest = ", ".join(f"{name} {us / 1e3:.0f} ms" for name, us in result["slowest"])
+        print(f"{page:<22} {result['import_ms']:7.0f} ms  RSS {result['rss_mb']:5.0f} MB  ({slowest})")
+        if result["import_ms"] > args.max_ms or result["rss_mb"] > args.max_rss_mb:
+            over_budget.append(page)
+
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+    if over_budget:
+        print(f"Over budget ({args.max_ms:g} ms, {args.max_rss_mb:g} MB): {', '.join(over_budget)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
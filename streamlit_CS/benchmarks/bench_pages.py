@@ -0,0 +1,149 @@
+"""Page render benchmark for the Dashboard and EDA Gallery on synthetic ledgers.
+
+For every size a synthetic ledger with the Coffee_sales.csv schema is
+written to a temporary directory, and each page is driven headlessly with
+Streamlit's AppTest in a fresh process (so caches and peak RSS are not
+shared between sizes). Reported per page: cold load (includes building the
+columnar cache and cube), warm load, latency of each scripted interaction,
+peak RSS and the Plotly payload size of every chart.
+
+Run from the repository root:
+
+    python streamlit_CS/benchmarks/bench_pages.py --sizes 10000 100000 1000000
+"""
+
+import argparse
+import datetime
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent.parent
+PAGES = ["pages/Dashboard.py", "pages/EDA_Gallery.py"]
+
+
+def chart_payloads(at) -> list[int]:
+    return [len(chart.proto.spec) for chart in at.get("plotly_chart")]
+
+
+def timed(action) -> float:
+    start = time.perf_counter()
+    action()
+    return time.perf_counter() - start
+
+
+def dashboard_interactions(at):
+    date_slider, hour_slider = at.sidebar.slider[0], at.sidebar.slider[1]
+    first_day = date_slider.value[0]  # both sliders start at the full date range
+
+    yield "one-month date range", lambda: date_slider.set_value(
+        (first_day, first_day + datetime.timedelta(days=30))
+    ).run()
+    yield "hour range 8-12", lambda: hour_slider.set_value((8, 12)).run()
+    yield "untick one coffee", lambda: at.sidebar.checkbox[0].uncheck().run()
+    yield "tick it again", lambda: at.sidebar.checkbox[0].check().run()
+
+
+def eda_interactions(at):
+    slider = at.slider[0]
+    first_day = slider.value[0]  # both sliders start at the full date range
+
+    yield "one-week date range", lambda: slider.set_value(
+        (first_day, first_day + datetime.timedelta(days=7))
+    ).run()
+
+
+INTERACTIONS = {
+    "pages/Dashboard.py": dashboard_interactions,
+    "pages/EDA_Gallery.py": eda_interactions,
+}
+
+
+def run_worker(page: str, timeout: float) -> dict:
+    """Measure one page in this process (COFFEE_SALES_PATH must already be set)."""
+    sys.path.insert(0, str(APP_DIR))
+    from streamlit.testing.v1 import AppTest
+
+    result = {"page": page}
+    at = AppTest.from_file(str(APP_DIR / page), default_timeout=timeout)
+    result["cold_load_s"] = timed(at.run)
+    if at.exception:
+        raise RuntimeError(at.exception[0].value)
+
+    at = AppTest.from_file(str(APP_DIR / page), default_timeout=timeout)
+    result["warm_load_s"] = timed(at.run)
+    result["chart_payload_bytes"] = chart_payloads(at)
+
+    result["interactions_s"] = {
+        name: timed(action) for name, action in INTERACTIONS[page](at)
+    }
+    if at.exception:
+        raise RuntimeError(at.exception[0].value)
+
+    # ru_maxrss is in KiB on Linux
+    result["peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return result
+
+
+def measure(csv_path: Path, page: str, timeout: float) -> dict:
+    env = dict(os.environ, COFFEE_SALES_PATH=str(csv_path))
+    completed = subprocess.run(
+        [sys.executable, __file__, "--worker", page, "--timeout", str(timeout)],
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"{page} failed on {csv_path}:\n{completed.stderr[-2000:]}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--pages", nargs="+", default=PAGES, choices=PAGES)
+    parser.add_argument("--timeout", type=float, default=600, help="Seconds allowed per page run.")
+    parser.add_argument("--json", type=Path, help="Also write the raw results to this file.")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker, args.timeout)))
+        return
+
+    from synthetic import make_ledger, write_ledger_csv
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_rows in args.sizes:
+            csv_path = Path(tmp) / f"ledger_{n_rows}" / "Coffee_sales.csv"
+            csv_path.parent.mkdir()
+            write_ledger_csv(make_ledger(n_rows), csv_path)
+
+            for page in args.pages:
+                result = measure(csv_path, page, args.timeout)
+                result["rows"] = n_rows
+                results.append(result)
+
+                interactions = ", ".join(
+                    f"{name} {seconds * 1e3:.0f} ms" for name, seconds in result["interactions_s"].items()
+                )
+                print(
+                    f"{n_rows:>12,}  {page:<22} cold {result['cold_load_s']:6.2f} s  "
+                    f"warm {result['warm_load_s']:6.2f} s  RSS {result['peak_rss_mb']:7.0f} MB  "
+                    f"charts {sum(result['chart_payload_bytes']) / 1024:8.1f} KB"
+                )
+                print(f"{'':>14}payload per chart (bytes): {result['chart_payload_bytes']}")
+                print(f"{'':>14}{interactions}")
+
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Memory cost of concurrent sessions of the Dashboard and EDA Gallery.
+
+Every page shares the dataset, cube and figures process-wide; a session
+should only add its widget state and small per-session totals. For each
+size, a synthetic ledger is written to a temporary directory, and each
+page is opened by ``--sessions`` AppTest sessions kept alive in one fresh
+process. The private memory of that process is reported after the first
+session and after the last, with the average cost per extra session.
+
+Run from the repository root:
+
+    python streamlit_CS/benchmarks/bench_sessions.py --sizes 100000 1000000 --sessions 20
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent.parent
+PAGES = ["pages/Dashboard.py", "pages/EDA_Gallery.py"]
+
+
+def private_mb() -> float:
+    """Private (unshared) memory of this process in MB, from /proc (Linux)."""
+    fields = {}
+    for line in Path("/proc/self/smaps_rollup").read_text().splitlines()[1:]:
+        name, value = line.split(":")
+        fields[name] = int(value.split()[0])
+    return (fields["Private_Clean"] + fields["Private_Dirty"]) / 1024
+
+
+def run_worker(page: str, sessions: int, timeout: float) -> dict:
+    """Open ``sessions`` sessions of one page in this process (COFFEE_SALES_PATH must be set)."""
+    sys.path.insert(0, str(APP_DIR))
+    from streamlit.testing.v1 import AppTest
+
+    alive = []
+    result = {"page": page, "sessions": sessions}
+    for i in range(sessions):
+        at = AppTest.from_file(str(APP_DIR / page), default_timeout=timeout).run()
+        if at.exception:
+            raise RuntimeError(at.exception[0].value)
+        if at.sidebar.slider:
+            # Dashboard: filter once, so that the session's totals exist
+            at.sidebar.slider[1].set_value((8, 12)).run()
+        alive.append(at)
+        if i == 0:
+            result["first_session_mb"] = private_mb()
+    result["all_sessions_mb"] = private_mb()
+    result["per_extra_session_mb"] = (
+        (result["all_sessions_mb"] - result["first_session_mb"]) / max(sessions - 1, 1)
+    )
+    return result
+
+
+def measure(csv_path: Path, page: str, sessions: int, timeout: float) -> dict:
+    env = dict(os.environ, COFFEE_SALES_PATH=str(csv_path))
+    completed = subprocess.run(
+        [sys.executable, __file__, "--worker", page, "--sessions", str(sessions), "--timeout", str(timeout)],
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"{page} failed on {csv_path}:\n{completed.stderr[-2000:]}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--pages", nargs="+", default=PAGES, choices=PAGES)
+    parser.add_argument("--timeout", type=float, default=600, help="Seconds allowed per page run.")
+    parser.add_argument("--json", type=Path, help="Also write the raw results to this file.")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker, args.sessions, args.timeout)))
+        return
+
+    from synthetic import make_ledger, write_ledger_csv
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_rows in args.sizes:
+            csv_path = Path(tmp) / f"ledger_{n_rows}" / "Coffee_sales.csv"
+            csv_path.parent.mkdir()
+            write_ledger_csv(make_ledger(n_rows), csv_path)
+
+            for page in args.pages:
+                result = measure(csv_path, page, args.sessions, args.timeout)
+                result["rows"] = n_rows
+                results.append(result)
+                print(
+                    f"{n_rows:>12,}  {page:<22} 1 session {result['first_session_mb']:7.0f} MB  "
+                    f"{args.sessions} sessions {result['all_sessions_mb']:7.0f} MB  "
+                    f"per extra session {result['per_extra_session_mb']:6.2f} MB"
+                )
+
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Regression check of read_sales() filter pushdown on every data layout.
+
+A synthetic ledger is written as a single CSV, a directory of daily CSV
+partitions and a directory of daily Parquet partitions. For each, the
+rows read with date and coffee filters (including no coffees at all)
+must equal the same filters applied in pandas. Exits with status 1 on
+a mismatch.
+
+Run from the repository root:
+
+    python streamlit_CS/benchmarks/check_read_sales.py
+"""
+
+import argparse
+import sys
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sales_data import read_sales  # noqa: E402
+from synthetic import COFFEE_PRICES, make_ledger, write_ledger_csv  # noqa: E402
+
+COLUMNS = ["Date", "coffee_name", "money", "hour_of_day"]
+
+
+def write_layouts(df: pd.DataFrame, root: Path) -> dict[str, Path]:
+    """Write ``df`` in every supported layout under ``root``; return {layout: path}."""
+    single = root / "single.csv"
+    write_ledger_csv(df, single)
+    for layout in ("csv_parts", "parquet_parts"):
+        (root / layout).mkdir()
+    for day, rows in df.groupby("Date"):
+        name = f"date={day:%Y-%m-%d}"
+        write_ledger_csv(rows, root / "csv_parts" / f"{name}.csv")
+        rows.to_parquet(root / "parquet_parts" / f"{name}.parquet", index=False)
+    return {"single CSV": single, "CSV partitions": root / "csv_parts", "Parquet partitions": root / "parquet_parts"}
+
+
+def expected_rows(df: pd.DataFrame, date_range, coffees) -> pd.DataFrame:
+    start, end = (pd.Timestamp(day) for day in date_range)
+    mask = df["Date"].between(start, end)
+    if coffees is not None:
+        mask &= df["coffee_name"].isin(coffees)
+    return df.loc[mask, COLUMNS]
+
+
+def same_rows(got: pd.DataFrame, expected: pd.DataFrame) -> bool:
+    def key(df):
+        df = df[COLUMNS].astype({"coffee_name": str, "hour_of_day": "int64"})
+        return df.sort_values(COLUMNS, ignore_index=True)
+
+    return len(got) == len(expected) and key(got).equals(key(expected))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=5_000)
+    parser.add_argument("--days", type=int, default=30)
+    args = parser.parse_args()
+
+    df = make_ledger(args.rows, days=args.days)
+    first = df["Date"].iloc[0].date()
+    date_range = (first + pd.Timedelta(days=5), first + pd.Timedelta(days=12))
+    cases = {
+        "date range": (date_range, None),
+        "two coffees": (date_range, list(COFFEE_PRICES)[:2]),
+        "no coffees": (date_range, []),
+    }
+
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for layout, path in write_layouts(df, Path(tmp)).items():
+            for case, (dates, coffees) in cases.items():
+                got = read_sales(COLUMNS, date_range=dates, coffees=coffees, path=path)
+                ok = same_rows(got, expected_rows(df, dates, coffees))
+                print(f"{layout:<20} {case:<12} {len(got):>6,} rows  {'ok' if ok else 'MISMATCH'}")
+                if not ok:
+                    failures.append(f"{layout} / {case}")
+
+    if failures:
+        print(f"Mismatches: {', '.join(failures)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
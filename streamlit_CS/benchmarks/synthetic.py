@@ -0,0 +1,64 @@
+"""Synthetic coffee ledgers with the same schema as data/Coffee_sales.csv."""
+
+import numpy as np
+import pandas as pd
+
+COFFEE_PRICES = {
+    "Americano": 28.9,
+    "Americano with Milk": 33.8,
+    "Cappuccino": 38.7,
+    "Cocoa": 38.7,
+    "Cortado": 28.9,
+    "Espresso": 23.02,
+    "Hot Chocolate": 38.7,
+    "Latte": 38.7,
+}
+WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+MONTHS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+
+
+def make_ledger(n_rows: int, start="2024-03-01", days=730, seed=0) -> pd.DataFrame:
+    """Return ``n_rows`` random transactions sorted by Date and Time.
+
+    Transactions are spread uniformly over ``days`` days, between 6 AM and
+    11 PM.
+    """
+    rng = np.random.default_rng(seed)
+
+    day = rng.integers(0, days, n_rows)
+    seconds = rng.integers(6 * 3600, 23 * 3600, n_rows)
+    order = np.lexsort((seconds, day))
+    day, seconds = day[order], seconds[order]
+
+    dates = pd.Timestamp(start) + pd.to_timedelta(day, unit="D")
+    coffee = pd.Categorical.from_codes(
+        rng.integers(0, len(COFFEE_PRICES), n_rows), list(COFFEE_PRICES)
+    )
+    hours = (seconds // 3600).astype("int8")
+    weekday_sort = (dates.dayofweek + 1).to_numpy().astype("int8")
+    month_sort = dates.month.to_numpy().astype("int8")
+
+    return pd.DataFrame({
+        "hour_of_day": hours,
+        "cash_type": pd.Categorical(np.where(rng.random(n_rows) < 0.97, "card", "cash")),
+        "money": np.asarray(coffee.map(COFFEE_PRICES), dtype="float64"),
+        "coffee_name": coffee,
+        "Time_of_Day": pd.Categorical(
+            np.select([hours < 12, hours < 17], ["Morning", "Afternoon"], "Night")
+        ),
+        "Weekday": pd.Categorical.from_codes(weekday_sort - 1, WEEKDAYS),
+        "Month_name": pd.Categorical.from_codes(month_sort - 1, MONTHS),
+        "Weekdaysort": weekday_sort,
+        "Monthsort": month_sort,
+        "Date": dates,
+        "Time": pd.to_timedelta(seconds, unit="s"),
+    })
+
+
+def write_ledger_csv(df: pd.DataFrame, path) -> None:
+    """Write ``df`` in the same text layout as data/Coffee_sales.csv."""
+    out = df.copy()
+    out["Date"] = out["Date"].dt.strftime("%Y-%m-%d")
+    seconds = out["Time"].dt.total_seconds()
+    out["Time"] = pd.to_datetime(seconds, unit="s").dt.strftime("%H:%M:%S.%f")
+    out.to_csv(path, index=False)
@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+
+
+def _kth_value(values, cumulative, k):
+    # k-th smallest sample (0-based) of every group, from cumulative counts
+    return values[(cumulative <= k[:, None]).sum(axis=1)]
+
+
+def _quantile(values, cumulative, n, p):
+    # Plotly's default ("linear") rule: position p * n - 0.5, clamped to the data
+    position = np.clip(p * n - 0.5, 0, n - 1)
+    lower = np.floor(position)
+    upper = np.ceil(position)
+    weight = position - lower
+    return (
+        weight * _kth_value(values, cumulative, upper)
+        + (1 - weight) * _kth_value(values, cumulative, lower)
+    )
+
+
+def box_stats_from_counts(values, counts: pd.DataFrame) -> pd.DataFrame:
+    """Return box-plot statistics for groups given as value histograms.
+
+    ``values`` are the sorted sample values and ``counts`` holds one row per
+    group with the number of samples equal to each value. The quartiles,
+    whisker ends (``lowerfence``/``upperfence``, the most extreme samples
+    within 1.5 IQR of the box) and the distinct ``outliers`` beyond them
+    match what Plotly computes from the raw samples. Groups without samples
+    are dropped.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    matrix = counts.to_numpy(dtype=np.int64)
+    keep = matrix.sum(axis=1) > 0
+    matrix = matrix[keep]
+    present = matrix > 0
+
+    cumulative = matrix.cumsum(axis=1)
+    n = cumulative[:, -1].astype(np.float64)
+    q1 = _quantile(values, cumulative, n, 0.25)
+    median = _quantile(values, cumulative, n, 0.5)
+    q3 = _quantile(values, cumulative, n, 0.75)
+
+    iqr = q3 - q1
+    low_ok = present & (values >= (q1 - 1.5 * iqr)[:, None])
+    high_ok = present & (values <= (q3 + 1.5 * iqr)[:, None])
+    lowerfence = np.minimum(q1, values[low_ok.argmax(axis=1)])
+    upperfence = np.maximum(q3, values[len(values) - 1 - high_ok[:, ::-1].argmax(axis=1)])
+
+    outside = present & (
+        (values < lowerfence[:, None]) | (values > upperfence[:, None])
+    )
+    return pd.DataFrame(
+        {
+            "q1": q1,
+            "median": median,
+            "q3": q3,
+            "lowerfence": lowerfence,
+            "upperfence": upperfence,
+            "outliers": [values[row] for row in outside],
+            "count": n.astype(np.int64),
+        },
+        index=counts.index[keep],
+    )
@@ -0,0 +1,102 @@
+"""The Dashboard's client-filter mode: one linked Vega-Lite chart over the cube.
+
+The cube is sent to the browser once, at its (Date, hour_of_day,
+coffee_name) grain, and every filter is a Vega-Lite selection applied
+there: brushing the daily revenue line or the hour bars, or clicking
+heatmap cells, coffee bars or month bars (shift-click to add, double-click
+to clear) filters all the other views, so filtering needs no rerun.
+"""
+
+import altair as alt
+import numpy as np
+import pandas as pd
+
+from sales_data import WEEKDAY_NAMES
+
+
+def client_table(cube: pd.DataFrame) -> pd.DataFrame:
+    """Return the cube in the compact form shipped to the browser.
+
+    Dates are dictionary-encoded ISO strings and revenue is int32 cents;
+    the calendar labels are derived in the browser from Date.
+    """
+    return pd.DataFrame({
+        "Date": cube["Date"].dt.strftime("%Y-%m-%d").astype("category"),
+        "hour_of_day": cube["hour_of_day"].to_numpy(np.int8),
+        "coffee_name": cube["coffee_name"],
+        "cents": np.rint(cube["revenue"].to_numpy() * 100).astype(np.int32),
+        "sales": cube["sales"].to_numpy(np.int32),
+    })
+
+
+def build_client_chart(table: pd.DataFrame, heatmap_colors: list) -> alt.VConcatChart:
+    """Return the cross-filtering KPI, timeline, hour, heatmap, coffee and month views of ``table``."""
+    # ISO dates parse as UTC midnight, so calendar fields use UTC functions
+    base = alt.Chart(table).transform_calculate(
+        Day="toDate(datum.Date)",
+        revenue="datum.cents / 100",
+        Weekday=f"{WEEKDAY_NAMES}[(utcday(toDate(datum.Date)) + 6) % 7]",
+        Month="utcFormat(toDate(datum.Date), '%b %Y')",
+        Monthsort="utcFormat(toDate(datum.Date), '%Y-%m')",
+    )
+
+    date_brush = alt.selection_interval(name="date_brush", encodings=["x"])
+    hour_brush = alt.selection_interval(name="hour_brush", encodings=["x"])
+    cell_pick = alt.selection_point(name="cell_pick", fields=["Weekday", "hour_of_day"])
+    coffee_pick = alt.selection_point(name="coffee_pick", fields=["coffee_name"])
+    month_pick = alt.selection_point(name="month_pick", fields=["Month"])
+    selections = [date_brush, hour_brush, cell_pick, coffee_pick, month_pick]
+
+    def filtered(own=None):
+        # Each view is filtered by every selection but its own
+        chart = base
+        for selection in selections:
+            if selection is not own:
+                chart = chart.transform_filter(selection)
+        return chart
+
+    totals = filtered().transform_aggregate(revenue="sum(revenue)", sales="sum(sales)")
+    kpis = alt.hconcat(*[
+        totals.transform_calculate(text=expression).mark_text(fontSize=24, align="left")
+        .encode(text="text:N")
+        .properties(title=title, width=200, height=40)
+        for title, expression in [
+            ("Total Revenue", "format(datum.revenue, '$,.2f')"),
+            ("Avg Revenue / Sale", "datum.sales ? format(datum.revenue / datum.sales, '$,.2f') : '$0'"),
+            ("Total Sales", "format(datum.sales, ',')"),
+        ]
+    ])
+
+    timeline = filtered(date_brush).mark_area(color="#C19A6B", line={"color": "#6F4E37"}).encode(
+        x=alt.X("Day:T", scale=alt.Scale(type="utc"), title="Date (drag to select a range)"),
+        y=alt.Y("sum(revenue):Q", title="Revenue ($)"),
+    ).add_params(date_brush).properties(title="Daily Revenue", width=900, height=120)
+
+    hours = filtered(hour_brush).mark_bar(color="#8B5A2B").encode(
+        x=alt.X("hour_of_day:Q", scale=alt.Scale(domain=[0, 24]), title="Hour of Day (drag to select a range)"),
+        y=alt.Y("sum(sales):Q", title="Sales"),
+    ).add_params(hour_brush).properties(title="Sales by Hour", width=900, height=100)
+
+    heatmap = filtered(cell_pick).mark_rect().encode(
+        x=alt.X("hour_of_day:O", title="Hour of Day (24-hour clock)"),
+        y=alt.Y("Weekday:O", sort=WEEKDAY_NAMES, title="Day of Week"),
+        color=alt.Color("sum(revenue):Q", scale=alt.Scale(range=heatmap_colors), title="Total Revenue ($)"),
+        opacity=alt.condition(cell_pick, alt.value(1), alt.value(0.3)),
+        tooltip=["Weekday:O", "hour_of_day:O", alt.Tooltip("sum(revenue):Q", format="$,.2f")],
+    ).add_params(cell_pick).properties(title="Sales Heatmap by Day and Hour", width=900, height=220)
+
+    coffees = filtered(coffee_pick).mark_bar(color="#6F4E37").encode(
+        x=alt.X("coffee_name:N", sort="-y", title="Coffee Type"),
+        y=alt.Y("sum(revenue):Q", title="Total Revenue ($)"),
+        opacity=alt.condition(coffee_pick, alt.value(1), alt.value(0.3)),
+        tooltip=["coffee_name:N", alt.Tooltip("sum(revenue):Q", format="$,.2f")],
+    ).add_params(coffee_pick).properties(title="Total Revenue by Coffee Type", width=420, height=260)
+
+    months = filtered(month_pick).mark_bar(color="#A47148").encode(
+        x=alt.X("Month:N", sort=alt.EncodingSortField("Monthsort", op="min"), title="Month (Year)"),
+        y=alt.Y("sum(revenue):Q", title="Total Revenue ($)"),
+        opacity=alt.condition(month_pick, alt.value(1), alt.value(0.3)),
+        tooltip=["Month:N", alt.Tooltip("sum(revenue):Q", format="$,.2f")],
+    ).add_params(month_pick).properties(title="Total Revenue by Month (Year-Aware)", width=420, height=260)
+
+    return alt.vconcat(kpis, timeline, hours, heatmap, alt.hconcat(coffees, months))
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+
+
+def lttb_indices(x, y, n_out: int) -> np.ndarray:
+    """Return the positions of ``n_out`` points chosen by Largest-Triangle-Three-Buckets.
+
+    The first and last points are always kept. The points in between are
+    split into ``n_out - 2`` equal buckets, and from each bucket the point
+    forming the largest triangle with the previously kept point and the
+    average of the next bucket is kept, which preserves visible peaks and
+    dips. ``x`` must be numeric and increasing.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    kept = np.empty(n_out, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+
+    a = 0
+    for i in range(n_out - 2):
+        start, stop = edges[i], edges[i + 1]
+        next_stop = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[stop:next_stop].mean()
+        avg_y = y[stop:next_stop].mean()
+
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:stop] - y[a])
+            - (x[a] - x[start:stop]) * (avg_y - y[a])
+        )
+        a = start + int(area.argmax())
+        kept[i + 1] = a
+    return kept
+
+
+def downsample_series(df: pd.DataFrame, x: str, y: str, n_out: int) -> pd.DataFrame:
+    """Return at most ``n_out`` rows of a time series sorted by ``x`` (see ``lttb_indices``)."""
+    if len(df) <= n_out:
+        return df
+    x_values = df[x].to_numpy()
+    if np.issubdtype(x_values.dtype, np.datetime64):
+        x_values = x_values.astype("datetime64[s]").astype(np.int64)
+    return df.iloc[lttb_indices(x_values, df[y].to_numpy(), n_out)]
@@ -0,0 +1,77 @@
+import gzip
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Rows converted per step; bounds export memory regardless of result size
+EXPORT_CHUNK_ROWS = 100_000
+
+EXPORT_FORMATS = {
+    "CSV": ("csv", "text/csv"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+}
+
+
+def _source_csv_layout(chunk: pd.DataFrame) -> pd.DataFrame:
+    # Write Date/Time the way data/Coffee_sales.csv stores them
+    out = chunk.copy()
+    if "Date" in out and pd.api.types.is_datetime64_any_dtype(out["Date"]):
+        out["Date"] = out["Date"].dt.strftime("%Y-%m-%d")
+    if "Time" in out and pd.api.types.is_timedelta64_dtype(out["Time"]):
+        micros = out["Time"].to_numpy().astype("timedelta64[us]").astype(np.int64)
+        out["Time"] = pd.to_datetime(micros, unit="us").strftime("%H:%M:%S.%f")
+    return out
+
+
+def iter_csv_bytes(chunks):
+    """Yield UTF-8 CSV text for each chunk, with the header only once."""
+    header = True
+    for chunk in chunks:
+        yield _source_csv_layout(chunk).to_csv(index=False, header=header).encode("utf-8")
+        header = False
+
+
+def write_export(chunks, fmt: str, sink, compress: bool = False) -> None:
+    """Write ``chunks`` (DataFrames with the same columns) to the binary file ``sink``.
+
+    CSV is optionally gzip-compressed; Parquet uses zstd when ``compress``
+    is set and snappy otherwise, one row group per chunk.
+    """
+    if fmt == "csv":
+        out = gzip.GzipFile(fileobj=sink, mode="wb") if compress else sink
+        for data in iter_csv_bytes(chunks):
+            out.write(data)
+        if compress:
+            out.close()
+        return
+
+    writer = None
+    for chunk in chunks:
+        table = pa.Table.from_pandas(chunk.rename(columns=str), preserve_index=False)
+        if writer is None:
+            writer = pq.ParquetWriter(sink, table.schema, compression="zstd" if compress else "snappy")
+        writer.write_table(table.cast(writer.schema))
+    if writer is not None:
+        writer.close()
+
+
+def export_file(chunks, fmt: str, compress: bool = False):
+    """Write an export to an anonymous temporary file and return it, rewound.
+
+    The file is deleted by the OS once it is closed.
+    """
+    sink = tempfile.TemporaryFile()
+    write_export(chunks, fmt, sink, compress)
+    sink.seek(0)
+    return sink
+
+
+def export_file_name(stem: str, fmt: str, compress: bool) -> tuple[str, str]:
+    """Return (file name, MIME type) for an export."""
+    extension, mime = next(v for v in EXPORT_FORMATS.values() if v[0] == fmt)
+    if fmt == "csv" and compress:
+        return f"{stem}.csv.gz", "application/gzip"
+    return f"{stem}.{extension}", mime
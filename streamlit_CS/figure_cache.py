@@ -0,0 +1,128 @@
+import datetime
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import streamlit as st
+
+FIGURE_CACHE_SIZE = 256
+
+# Threads, shared by all sessions, that build the missing figures of a rerun
+# concurrently (pandas/NumPy kernels and SQLite queries release the GIL).
+# 1 builds them one after another in the script thread.
+FIGURE_WORKERS = int(os.environ.get("COFFEE_SALES_FIGURE_WORKERS", min(4, os.cpu_count() or 1)))
+
+
+def normalize_filters(*values) -> tuple:
+    """Turn filter values into a hashable key that ignores selection order."""
+    normalized = []
+    for value in values:
+        if isinstance(value, (datetime.date, datetime.datetime)):
+            normalized.append(value.isoformat())
+        elif isinstance(value, (list, set, frozenset)):
+            normalized.append(tuple(sorted(normalize_filters(*value))))
+        elif isinstance(value, tuple):
+            normalized.append(normalize_filters(*value))
+        else:
+            normalized.append(value)
+    return tuple(normalized)
+
+
+class FigureCache:
+    """Thread-safe LRU cache of built Plotly figures.
+
+    Entries are keyed by (chart id, normalized filter tuple, data version).
+    Cached figures are shared across sessions and must not be modified
+    after they are returned.
+    """
+
+    def __init__(self, max_entries: int = FIGURE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._figures = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _lookup(self, key):
+        with self._lock:
+            figure = self._figures.get(key)
+            if figure is not None:
+                self._figures.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+            return figure
+
+    def _store(self, key, figure) -> None:
+        with self._lock:
+            self._figures[key] = figure
+            self._figures.move_to_end(key)
+            while len(self._figures) > self.max_entries:
+                self._figures.popitem(last=False)
+
+    def get_or_build(self, chart_id: str, filters: tuple, version: str, build):
+        """Return the cached figure for this key, calling ``build()`` on a miss."""
+        key = (chart_id, normalize_filters(*filters), version)
+        figure = self._lookup(key)
+        if figure is None:
+            figure = build()
+            self._store(key, figure)
+        return figure
+
+    def get_or_build_many(self, builds: dict, filters: tuple, version: str, executor=None, cancelled=None) -> dict:
+        """``get_or_build`` for several charts: return {chart id: figure}.
+
+        ``builds`` maps chart ids to build functions. When ``executor`` is
+        given, the misses are built on it concurrently and joined before
+        returning, so the slowest build sets the wall time. Build functions
+        run outside the script thread and must not call Streamlit. Once the
+        ``cancelled`` event is set, builds that have not started are
+        skipped and their charts are left out of the result.
+        """
+        normalized = normalize_filters(*filters)
+        keys = {chart_id: (chart_id, normalized, version) for chart_id in builds}
+        figures = {chart_id: self._lookup(key) for chart_id, key in keys.items()}
+        missing = [chart_id for chart_id, figure in figures.items() if figure is None]
+
+        def build(chart_id):
+            if cancelled is not None and cancelled.is_set():
+                return None
+            return builds[chart_id]()
+
+        if executor is None or len(missing) < 2:
+            built = {chart_id: build(chart_id) for chart_id in missing}
+        else:
+            futures = {chart_id: executor.submit(build, chart_id) for chart_id in missing}
+            built = {chart_id: future.result() for chart_id, future in futures.items()}
+
+        for chart_id, figure in built.items():
+            if figure is None:
+                del figures[chart_id]
+                continue
+            self._store(keys[chart_id], figure)
+            figures[chart_id] = figure
+        return figures
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._figures),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+@st.cache_resource(show_spinner=False)
+def get_figure_cache() -> FigureCache:
+    """Return the process-wide figure cache shared by all pages and sessions."""
+    return FigureCache()
+
+
+@st.cache_resource(show_spinner=False)
+def get_figure_executor() -> ThreadPoolExecutor | None:
+    """Return the process-wide figure build pool, or None when FIGURE_WORKERS is 1."""
+    if FIGURE_WORKERS <= 1:
+        return None
+    return ThreadPoolExecutor(max_workers=FIGURE_WORKERS, thread_name_prefix="figure-build")
@@ -0,0 +1,162 @@
+import numpy as np
+import pandas as pd
+from sales_aggregates import extends_table, revenue_tables
+from sales_cube import load_versioned
+
+# Smoothing constants tried for every series. All combinations are run side
+# by side, and each series uses the one with the smallest one-step-ahead
+# squared error so far.
+ALPHAS = (0.05, 0.1, 0.2, 0.3, 0.5)
+BETAS = (0.0, 0.01, 0.05)
+GAMMAS = (0.05, 0.1, 0.3)
+
+DAILY_HORIZON = 28
+MONTHLY_HORIZON = 3
+# Forecast bands cover 80% of the predicted outcomes
+BAND_Z = 1.2816
+
+
+class SmoothingState:
+    """Additive Holt-Winters models of a batch of series, one per smoothing grid point.
+
+    Level, trend and seasonal states have a leading grid axis and a series
+    axis, so one ``update`` step advances every series under every
+    combination of constants with a few array operations. ``period`` 1
+    means no seasonality (Holt's linear trend).
+    """
+
+    def __init__(self, values: np.ndarray, period: int):
+        # values: (series, steps) with at least 2 * period steps
+        self.period = period
+        gammas = GAMMAS if period > 1 else (0.0,)
+        alpha, beta, gamma = np.meshgrid(ALPHAS, BETAS, gammas, indexing="ij")
+        self.alpha, self.beta, self.gamma = (a.reshape(-1, 1) for a in (alpha, beta, gamma))
+
+        # Initial states from the first two periods
+        first = values[:, :period].mean(axis=1)
+        second = values[:, period:2 * period].mean(axis=1)
+        grid = (len(self.alpha), len(values))
+        self.level = np.broadcast_to(first, grid).copy()
+        self.trend = np.broadcast_to((second - first) / period, grid).copy()
+        self.season = np.broadcast_to(values[:, :period] - first[:, None], grid + (period,)).copy()
+        self.sse = np.zeros(grid)
+        self.steps = 0
+
+    def copy(self) -> "SmoothingState":
+        state = object.__new__(SmoothingState)
+        state.__dict__.update({
+            name: value.copy() if isinstance(value, np.ndarray) else value
+            for name, value in self.__dict__.items()
+        })
+        return state
+
+    def update(self, values: np.ndarray) -> None:
+        """Continue every model over the next steps in ``values`` (series, steps)."""
+        for observed in values.T:
+            s = self.steps % self.period
+            season = self.season[:, :, s]
+            error = observed - (self.level + self.trend + season)
+            self.sse += error ** 2
+            self.level += self.trend + self.alpha * error
+            self.trend += self.alpha * self.beta * error
+            self.season[:, :, s] = season + self.gamma * error
+            self.steps += 1
+
+    def forecast(self, horizon: int) -> tuple[np.ndarray, np.ndarray]:
+        """Return the point forecasts and their variances, both (series, horizon)."""
+        series = np.arange(self.level.shape[1])
+        best = self.sse.argmin(axis=0)
+        alpha, beta, gamma = self.alpha[best, 0], self.beta[best, 0], self.gamma[best, 0]
+        steps = np.arange(1, horizon + 1)
+
+        season = self.season[best, series][:, (self.steps + steps - 1) % self.period]
+        point = self.level[best, series, None] + self.trend[best, series, None] * steps + season
+
+        # ETS(A,A,A): each earlier step j adds (alpha (1 + j beta) + gamma [j a multiple of period])^2
+        j = steps[:-1]
+        weights = alpha[:, None] * (1 + j * beta[:, None]) + gamma[:, None] * (j % self.period == 0)
+        growth = np.concatenate([np.ones((len(series), 1)), 1 + np.cumsum(weights ** 2, axis=1)], axis=1)
+        variance = (self.sse[best, series] / max(self.steps, 1))[:, None] * growth
+        return point, variance
+
+
+class SeriesForecast:
+    """Fitted models for the columns of a revenue table (one row per period).
+
+    The last row may still change (today's sales are still coming in), so
+    the models are kept as of the row before it too. When ``base`` was fit
+    on a table that the new one only extends past that checkpoint, fitting
+    resumes from it and only the new rows are run through the models.
+    """
+
+    def __init__(self, table: pd.DataFrame, period: int, freq: str, base: "SeriesForecast | None" = None):
+        self.table = table
+        self.period = period
+        self.freq = freq
+        values = table.to_numpy(dtype=np.float64).T
+        checkpoint = len(table) - 1
+
+        resume = base is not None and base.resumable(table)
+        if resume:
+            state = base._checkpoint.copy()
+            state.update(values[:, base._checkpoint.steps:checkpoint])
+        else:
+            state = SmoothingState(values, period)
+            state.update(values[:, :checkpoint])
+        self.resumed = resume
+        self._checkpoint = state
+        self._state = state.copy()
+        self._state.update(values[:, checkpoint:])
+
+    def resumable(self, table: pd.DataFrame) -> bool:
+        """Whether ``table`` only changes or adds rows after this fit's checkpoint."""
+        return extends_table(table, self.table, self._checkpoint.steps)
+
+    def forecast(self, columns, horizon: int, history: int) -> pd.DataFrame:
+        """Return the last ``history`` periods and a ``horizon`` forecast of the ``columns``' total.
+
+        Rows have a Date and either the observed ``revenue`` or the
+        ``forecast`` with its ``lower``/``upper`` band; the series are
+        assumed independent when their variances are added up.
+        """
+        selected = self.table.columns.get_indexer(list(columns))
+        selected = selected[selected >= 0]
+        point, variance = self._state.forecast(horizon)
+        point, spread = point[selected].sum(axis=0), BAND_Z * np.sqrt(variance[selected].sum(axis=0))
+
+        observed = self.table.iloc[-history:, selected].sum(axis=1)
+        future = pd.date_range(self.table.index[-1], periods=horizon + 1, freq=self.freq)[1:]
+        return pd.concat([
+            pd.DataFrame({"Date": observed.index, "revenue": observed.to_numpy()}),
+            pd.DataFrame({
+                "Date": future,
+                "forecast": point,
+                "lower": np.maximum(point - spread, 0),
+                "upper": point + spread,
+            }),
+        ], ignore_index=True)
+
+
+class RevenueForecasts:
+    """Daily (weekly seasonal) and monthly (trend only) forecasts of every coffee type.
+
+    A model is None when the data is too short for it. With ``base``, the
+    models are refit incrementally from base's (see SeriesForecast).
+    """
+
+    def __init__(self, cube: pd.DataFrame, version: str, base: "RevenueForecasts | None" = None):
+        self.version = version
+        daily, monthly = revenue_tables(cube)
+        self.daily = self.monthly = None
+        if len(daily) >= 14:
+            self.daily = SeriesForecast(daily, 7, "D", base.daily if base is not None else None)
+        if len(monthly) >= 3:
+            self.monthly = SeriesForecast(monthly, 1, "MS", base.monthly if base is not None else None)
+
+
+def load_forecasts() -> RevenueForecasts:
+    """Return the revenue forecasts for the current data, fitted once per version.
+
+    The result is shared between sessions and must not be mutated.
+    """
+    return load_versioned("forecasts", RevenueForecasts)
@@ -0,0 +1,159 @@
+"""Opt-in per-rerun timing of page stages.
+
+Enable with the ``?debug=1`` query parameter or ``COFFEE_SALES_DEBUG=1``.
+When enabled, every stage a page wraps in ``profile.stage(...)`` and every
+chart sent through ``profile.plotly_chart(...)`` is timed. The timings are
+then shown in a collapsible panel, logged as one JSON line per rerun on the
+``coffee_sales.perf`` logger, and added to Prometheus text-format metrics in
+``COFFEE_SALES_METRICS_PATH`` (default ``data/.cache/metrics.prom``).
+When disabled, the profile does nothing.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import pandas as pd
+import plotly.io as pio
+import streamlit as st
+
+from sales_data import CACHE_DIR
+
+logger = logging.getLogger("coffee_sales.perf")
+
+METRICS_PATH = Path(os.environ.get("COFFEE_SALES_METRICS_PATH", CACHE_DIR / "metrics.prom"))
+
+
+def debug_enabled() -> bool:
+    if os.environ.get("COFFEE_SALES_DEBUG") == "1":
+        return True
+    return st.query_params.get("debug") == "1"
+
+
+class MetricsRegistry:
+    """Process-wide stage totals, written out in Prometheus text format."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._seconds = {}
+        self._counts = {}
+        self._last_rows = {}
+        self._last_payload = {}
+
+    def observe(self, page: str, stages: list[dict]) -> None:
+        with self._lock:
+            for stage in stages:
+                key = (page, stage["stage"])
+                self._seconds[key] = self._seconds.get(key, 0.0) + stage["seconds"]
+                self._counts[key] = self._counts.get(key, 0) + 1
+                if stage.get("rows") is not None:
+                    self._last_rows[key] = stage["rows"]
+                if stage.get("payload_bytes") is not None:
+                    self._last_payload[key] = stage["payload_bytes"]
+            text = self._render()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_text(text)
+        os.replace(tmp_path, self.path)
+
+    def _render(self) -> str:
+        def labels(key):
+            page, stage = key
+            return f'{{page="{page}",stage="{stage}"}}'
+
+        lines = [
+            "# HELP coffee_sales_stage_seconds Time spent in each page stage.",
+            "# TYPE coffee_sales_stage_seconds summary",
+        ]
+        for key in sorted(self._seconds):
+            lines.append(f"coffee_sales_stage_seconds_sum{labels(key)} {self._seconds[key]:.6f}")
+            lines.append(f"coffee_sales_stage_seconds_count{labels(key)} {self._counts[key]}")
+        lines += [
+            "# HELP coffee_sales_stage_rows Rows handled by the stage in the latest rerun.",
+            "# TYPE coffee_sales_stage_rows gauge",
+        ]
+        lines += [f"coffee_sales_stage_rows{labels(k)} {v}" for k, v in sorted(self._last_rows.items())]
+        lines += [
+            "# HELP coffee_sales_stage_payload_bytes Bytes sent by the stage in the latest rerun.",
+            "# TYPE coffee_sales_stage_payload_bytes gauge",
+        ]
+        lines += [f"coffee_sales_stage_payload_bytes{labels(k)} {v}" for k, v in sorted(self._last_payload.items())]
+        return "\n".join(lines) + "\n"
+
+
+@st.cache_resource(show_spinner=False)
+def get_metrics_registry() -> MetricsRegistry:
+    return MetricsRegistry(METRICS_PATH)
+
+
+class RerunProfile:
+    """Stage timings of one page rerun; a no-op unless ``enabled``."""
+
+    def __init__(self, page: str, enabled: bool):
+        self.page = page
+        self.enabled = enabled
+        self.stages = []
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str, rows=None):
+        """Time the enclosed block. The yielded dict accepts ``rows``/``payload_bytes``."""
+        record = {"stage": name, "rows": rows, "payload_bytes": None}
+        if not self.enabled:
+            yield record
+            return
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record["seconds"] = time.perf_counter() - start
+            self.stages.append(record)
+
+    def timed(self, name: str, func):
+        """Return ``func`` wrapped so that each call is recorded as stage ``name``.
+
+        The wrapper may run on another thread, such as a figure build pool.
+        """
+        def run(*args, **kwargs):
+            with self.stage(name):
+                return func(*args, **kwargs)
+        return run
+
+    def plotly_chart(self, fig, name: str, container=st, **kwargs):
+        """``container.plotly_chart(fig, **kwargs)``, timed and with its payload size."""
+        with self.stage(f"render:{name}") as record:
+            container.plotly_chart(fig, **kwargs)
+            if self.enabled:
+                record["payload_bytes"] = len(pio.to_json(fig, validate=False))
+
+    def finish(self, **details) -> None:
+        """Show the debug panel and publish the rerun's log line and metrics.
+
+        ``details`` (for example cache statistics) are shown in the panel.
+        """
+        if not self.enabled:
+            return
+        total = time.perf_counter() - self._started
+        self.stages.append({"stage": "total", "rows": None, "payload_bytes": None, "seconds": total})
+
+        logger.info(json.dumps({"page": self.page, "stages": self.stages}))
+        get_metrics_registry().observe(self.page, self.stages)
+
+        with st.expander("Debug: rerun timings"):
+            table = pd.DataFrame(self.stages, columns=["stage", "seconds", "rows", "payload_bytes"])
+            table["ms"] = (table.pop("seconds") * 1e3).round(2)
+            st.dataframe(table[["stage", "ms", "rows", "payload_bytes"]], hide_index=True)
+            if details:
+                st.json(details, expanded=False)
+            st.caption(f"Metrics file: {METRICS_PATH}")
+
+
+def start_profile(page: str) -> RerunProfile:
+    """Return the profile for the current rerun of ``page``."""
+    return RerunProfile(page, debug_enabled())
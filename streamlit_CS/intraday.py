@@ -0,0 +1,145 @@
+import numpy as np
+import pandas as pd
+from sales_data import WEEKDAY_NAMES
+
+# Bin widths, in minutes, offered for the intraday traffic charts
+BIN_MINUTES = (5, 15, 30)
+MINUTE_COLUMNS = ["Date", "seconds", "coffee_name"]
+MINUTES_PER_DAY = 24 * 60
+
+
+def build_minute_counts(df: pd.DataFrame) -> pd.DataFrame:
+    """Count transactions per (Date, minute of day, coffee_name), sorted by Date and minute."""
+    minute = df["seconds"].to_numpy() // 60
+    return (
+        df.assign(minute=minute.astype(np.int16))
+        .groupby(["Date", "minute", "coffee_name"], observed=True)
+        .size()
+        .rename("sales")
+        .reset_index()
+        .sort_values(["Date", "minute"], ignore_index=True)
+    )
+
+
+def combine_minute_counts(counts: list[pd.DataFrame]) -> pd.DataFrame:
+    """Merge the minute counts of separate partitions, adding up the minutes they share."""
+    if len(counts) == 1:
+        return counts[0]
+    merged = pd.concat(counts, ignore_index=True).astype({"coffee_name": "category"})
+    return (
+        merged.groupby(["Date", "minute", "coffee_name"], observed=True)["sales"]
+        .sum()
+        .reset_index()
+        .sort_values(["Date", "minute"], ignore_index=True)
+    )
+
+
+def append_minute_counts(counts: pd.DataFrame, new_counts: pd.DataFrame) -> pd.DataFrame:
+    """Merge the minute counts of appended sales into ``counts``.
+
+    As with ``append_cube``, only the days from the first new Date
+    onwards are re-merged.
+    """
+    keep = int(counts["Date"].searchsorted(new_counts["Date"].iloc[0]))
+    tail = combine_minute_counts([counts.iloc[keep:], new_counts])
+    merged = pd.concat([counts.iloc[:keep], tail], ignore_index=True)
+    return merged.astype({"coffee_name": "category"})
+
+
+def _clock(minutes) -> list[str]:
+    return [f"{m // 60:02d}:{m % 60:02d}" for m in minutes]
+
+
+class IntradayCounts:
+    """Minute-of-day sale counts as flat NumPy arrays, shared by all sessions.
+
+    Rows are (day, minute, coffee) with their number of sales, sorted by
+    day, so a date range is a slice found by binary search. Every table is
+    then one ``np.bincount`` over the rows that pass the hour and coffee
+    filters; no per-row datetime work is done after loading.
+    """
+
+    def __init__(self, counts: pd.DataFrame, version: str = ""):
+        self.version = version
+        self.coffee_types = sorted(counts["coffee_name"].cat.categories) if len(counts) else []
+        self.first_day = counts["Date"].iloc[0] if len(counts) else None
+        self.first_weekday = self.first_day.dayofweek if len(counts) else 0
+
+        if len(counts):
+            self.day = ((counts["Date"] - self.first_day) // pd.Timedelta(days=1)).to_numpy(np.int64)
+        else:
+            self.day = np.zeros(0, np.int64)
+        self.n_days = int(self.day[-1]) + 1 if len(self.day) else 0
+        self.minute = counts["minute"].to_numpy(np.int64)
+        self.coffee = counts["coffee_name"].cat.set_categories(self.coffee_types).cat.codes.to_numpy(np.int64)
+        self.sales = counts["sales"].to_numpy(np.int64)
+        for array in (self.day, self.minute, self.coffee, self.sales):
+            array.flags.writeable = False
+
+    def _days(self, date_range) -> tuple[int, int]:
+        # Day numbers [start, stop) of date_range, clamped to the data
+        start = (pd.Timestamp(date_range[0]) - self.first_day).days
+        stop = (pd.Timestamp(date_range[1]) - self.first_day).days + 1
+        return min(max(start, 0), self.n_days), min(max(stop, start, 0), self.n_days)
+
+    def _select(self, date_range, hour_range, coffees):
+        # (day, minute, sales) of the rows matching all three filters
+        start, stop = self._days(date_range)
+        rows = slice(*np.searchsorted(self.day, [start, stop]))
+        keep = np.zeros(len(self.coffee_types), dtype=bool)
+        keep[[self.coffee_types.index(c) for c in coffees if c in self.coffee_types]] = True
+        minute = self.minute[rows]
+        mask = keep[self.coffee[rows]] & (minute >= hour_range[0] * 60) & (minute < (hour_range[1] + 1) * 60)
+        return self.day[rows][mask], minute[mask], self.sales[rows][mask]
+
+    def _weekday_days(self, date_range) -> np.ndarray:
+        # Number of calendar days of each weekday (Mon first) in date_range
+        start, stop = self._days(date_range)
+        return np.bincount((self.first_weekday + np.arange(start, stop)) % 7, minlength=7)
+
+    def pressure(self, date_range, hour_range, coffees, bin_minutes: int) -> pd.DataFrame:
+        """Average sales per day in each ``bin_minutes`` bin (columns) for each weekday (rows).
+
+        Days without any sales count as zero, so the values are the
+        expected load of that slot. Only the bins within ``hour_range`` are
+        returned.
+        """
+        day, minute, sales = self._select(date_range, hour_range, coffees)
+        n_bins = MINUTES_PER_DAY // bin_minutes
+        weekday = (self.first_weekday + day) % 7
+        totals = np.bincount(weekday * n_bins + minute // bin_minutes, weights=sales, minlength=7 * n_bins)
+        average = totals.reshape(7, n_bins) / np.maximum(self._weekday_days(date_range), 1)[:, None]
+
+        bins = np.arange(hour_range[0] * 60 // bin_minutes, (hour_range[1] + 1) * 60 // bin_minutes)
+        return pd.DataFrame(
+            average[:, bins],
+            index=pd.Index(WEEKDAY_NAMES, name="Weekday"),
+            columns=pd.Index(_clock(bins * bin_minutes), name="Time of day"),
+        )
+
+    def peak_minutes(self, date_range, hour_range, coffees) -> pd.DataFrame:
+        """Per weekday: the minute of day with the most sales on average, and the busiest single minute.
+
+        ``avg_sales`` is the average number of sales in ``peak_minute`` on
+        that weekday and ``max_sales`` the most sales seen in any one
+        minute of any such day. Weekdays without sales are left out.
+        """
+        day, minute, sales = self._select(date_range, hour_range, coffees)
+        weekday = (self.first_weekday + day) % 7
+        profile = np.bincount(weekday * MINUTES_PER_DAY + minute, weights=sales, minlength=7 * MINUTES_PER_DAY)
+        profile = profile.reshape(7, MINUTES_PER_DAY) / np.maximum(self._weekday_days(date_range), 1)[:, None]
+
+        # Sales per (day, minute), summed over the selected coffees
+        keys, inverse = np.unique(day * MINUTES_PER_DAY + minute, return_inverse=True)
+        per_minute = np.bincount(inverse, weights=sales, minlength=len(keys))
+        max_sales = np.zeros(7)
+        np.maximum.at(max_sales, (self.first_weekday + keys // MINUTES_PER_DAY) % 7, per_minute)
+
+        peak = profile.argmax(axis=1)
+        has_sales = max_sales > 0
+        return pd.DataFrame({
+            "Weekday": np.array(WEEKDAY_NAMES)[has_sales],
+            "peak_minute": np.array(_clock(peak))[has_sales],
+            "avg_sales": profile[np.arange(7), peak][has_sales],
+            "max_sales": max_sales[has_sales].astype(np.int64),
+        })
@@ -1,16 +1,29 @@
 import streamlit as st
-import pandas as pd
-import altair as alt
-import plotly.express as px
-import matplotlib.pyplot as plt
-import seaborn as sns
-import numpy as np
 import datetime
+import functools
 from zoneinfo import ZoneInfo
-from pathlib import Path
+from box_stats import box_stats_from_counts
+from exporters import EXPORT_CHUNK_ROWS, EXPORT_FORMATS, export_file, export_file_name
+from figure_cache import get_figure_cache, get_figure_executor
+from forecasting import DAILY_HORIZON, MONTHLY_HORIZON, load_forecasts
+from instrumentation import start_profile
+from intraday import BIN_MINUTES
+from recompute import POLL_SECONDS, WAIT_SECONDS, BackgroundRecompute, get_recompute_executor
+from sales_aggregates import IncrementalAggregates
+from sales_cube import REFRESH_SECONDS, get_live_cube, load_cube_cells, load_daily_totals, load_intraday
+from sales_data import iter_sales_chunks
+from sql_backend import load_query_backend
 
 COFFEE_CONTINUOUS = ["#F7F3EE", "#D2B48C", "#C19A6B", "#A47148", "#6F4E37", "#3B2F2F"]
 
+# Tables behind the charts that can be exported besides the raw transactions
+EXPORT_TABLES = {
+    "Revenue by weekday and hour": lambda view: view.revenue_by_weekday_hour().reset_index(),
+    "Revenue by coffee type": lambda view: view.revenue_by_coffee(),
+    "Revenue by month": lambda view: view.revenue_by_month(),
+    "Sales by month and hour": lambda view: view.hour_counts_by_month().reset_index(),
+}
+
 st.set_page_config(
     page_title="Coffee Sales Dashboard",
     page_icon="☕",
@@ -20,18 +33,81 @@ st.set_page_config(
 
 st.title("Coffee Sales Dashboard")
 
-DATA_PATH = Path(__file__).parent.parent / "data" / "Coffee_sales.csv"
-df = pd.read_csv(DATA_PATH)
-df["Date"] = pd.to_datetime(df["Date"])
+# Opt-in stage timings (?debug=1); does nothing otherwise
+profile = start_profile("dashboard")
+
+# Pre-aggregated (Date, hour, coffee) cells; every chart below is answered
+# from the cells that match the current filters instead of from raw rows.
+with profile.stage("data load"):
+    cube_cells = load_cube_cells()
+cube = cube_cells.cube_filter.df
+
+# Built figures are reused for any filter state and dataset seen before
+figure_cache = get_figure_cache()
+
+
+# ───────────────────────────
+# FOOTER
+# ───────────────────────────
+# Shared by both filter modes; ends the rerun's profile
+def render_footer():
+    st.divider()
+    st.caption("**Data source:** https://www.kaggle.com/datasets/kainatjamil12/coffe-sale/data")
+    local_time = datetime.datetime.now(ZoneInfo("America/Denver"))
+    last_refreshed = local_time.strftime("%Y-%m-%d %I:%M %p")
+    st.caption(f"Last refreshed: {last_refreshed} (local time)")
+
+    # Live refresh (COFFEE_SALES_REFRESH_SECONDS): poll for appended sales and
+    # rerun the page once they have been merged into the shared cube
+    if REFRESH_SECONDS:
+        @st.fragment(run_every=REFRESH_SECONDS)
+        def live_refresh():
+            live = get_live_cube()
+            live.refresh()
+            if live.cells is not cube_cells:
+                st.rerun()
+            st.caption(
+                f"Live: checking for new sales every {REFRESH_SECONDS:g} s; "
+                f"last update {live.updated_at:%H:%M:%S}"
+            )
+
+        live_refresh()
+
+    profile.finish(figure_cache=figure_cache.stats())
+
 
 # ───────────────────────────
 # SIDEBAR FILTERS
 # ───────────────────────────
 st.sidebar.header("Filters")
 
+# Client-filter mode: the cube is sent once and filtered in the browser by
+# linked chart selections, so changing a filter needs no rerun
+client_mode = st.sidebar.toggle(
+    "Filter in the browser",
+    help="Filter by selecting in the charts instead of with the sidebar; no round trip to the server.",
+)
+if client_mode:
+    from client_filter import build_client_chart, client_table
+
+    st.sidebar.caption(
+        "Drag across the daily revenue or hourly sales chart to pick a range. Click heatmap cells, "
+        "coffee types or months to filter the other charts (shift-click to add more, double-click to clear)."
+    )
+    client_chart = figure_cache.get_or_build(
+        "dashboard_client_filter",
+        (),
+        cube_cells.version,
+        profile.timed("figure:client_filter", lambda: build_client_chart(client_table(cube), COFFEE_CONTINUOUS)),
+    )
+    with profile.stage("render:client_filter"):
+        st.altair_chart(client_chart)
+    render_footer()
+    st.stop()
+
 # Date range slider
-min_date = df["Date"].min().date()
-max_date = df["Date"].max().date()
+min_date = cube["Date"].min().date()
+max_date = cube["Date"].max().date()
 
 date_range = st.sidebar.slider(
     "Date range",
@@ -42,8 +118,8 @@ date_range = st.sidebar.slider(
 )
 
 # Hour-of-day slider
-min_hour = int(df["hour_of_day"].min())
-max_hour = int(df["hour_of_day"].max())
+min_hour = int(cube["hour_of_day"].min())
+max_hour = int(cube["hour_of_day"].max())
 
 hour_range = st.sidebar.slider(
     "Hour of day",
@@ -56,7 +132,7 @@ hour_range = st.sidebar.slider(
 # Coffee type checkboxes
 st.sidebar.subheader("Coffee types")
 
-coffee_types = sorted(df["coffee_name"].unique())
+coffee_types = sorted(cube_cells.coffee_types)
 selected_coffees = []
 
 for coffee in coffee_types:
@@ -64,26 +140,268 @@ for coffee in coffee_types:
     if checked:
         selected_coffees.append(coffee)
 
-# Build filtered dataframe
-df_filtered = df.copy()
-
-start_date, end_date = date_range
-df_filtered = df_filtered[
-    (df_filtered["Date"].dt.date >= start_date)
-    & (df_filtered["Date"].dt.date <= end_date)
-]
+# Dashboard data for the current filters is computed by a per-session
+# background job (see recompute.py). A rerun waits briefly for it, then
+# shows the previous filters' results, marked stale, until it lands.
+query_backend = load_query_backend()
+version = query_backend.version if query_backend is not None else cube_cells.version
+filter_key = (date_range, hour_range, selected_coffees)
+daily_totals = load_daily_totals(cube_cells)
+recompute = st.session_state.setdefault("dashboard_recompute", BackgroundRecompute(get_recompute_executor()))
+session_aggregates = st.session_state.setdefault("dashboard_aggregates", {})
 
-start_hour, end_hour = hour_range
-df_filtered = df_filtered[
-    (df_filtered["hour_of_day"] >= start_hour)
-    & (df_filtered["hour_of_day"] <= end_hour)
-]
 
-if selected_coffees:
-    df_filtered = df_filtered[df_filtered["coffee_name"].isin(selected_coffees)]
-else:
-    # If nothing is selected, keep an empty frame
-    df_filtered = df_filtered.iloc[0:0]
+# ───────────────────────────
+# FIGURES
+# ───────────────────────────
+# The charts only read the selection they are given, so the background job
+# builds the ones missing from the figure cache concurrently
+# (COFFEE_SALES_FIGURE_WORKERS) before any of them is rendered. plotly.express and
+# plotly.subplots are imported by the builds that use them, so a worker
+# does not load them until a figure actually has to be built.
+def build_heatmap(selection):
+    import plotly.express as px
+
+    # Weekdays in calendar order (rows) by hour of day (columns)
+    pivot_table = selection.revenue_by_weekday_hour()
+
+    fig = px.imshow(
+        pivot_table,
+        text_auto=True,
+        aspect="auto",
+        color_continuous_scale=COFFEE_CONTINUOUS,
+        labels=dict(color="Total Revenue ($)")
+    )
+
+    fig.update_layout(
+        xaxis_title="Hour of Day (24-hour clock)",
+        yaxis_title="Day of Week",
+        margin=dict(l=10, r=10, t=40, b=10),
+    )
+
+    return fig
+
+
+def build_coffee_bar(selection):
+    import plotly.express as px
+
+    # Aggregate revenue by coffee type
+    coffee_revenue = selection.revenue_by_coffee().sort_values("money", ascending=False)
+
+    fig = px.bar(
+        coffee_revenue,
+        x="coffee_name",
+        y="money",
+        title="Total Revenue by Coffee Type",
+        text_auto=True,
+        color_discrete_sequence=["#6F4E37"]
+    )
+
+    fig.update_layout(
+        xaxis_title="Coffee Type",
+        yaxis_title="Total Revenue ($)",
+        margin=dict(l=10, r=10, t=40, b=10),
+    )
+
+    return fig
+
+
+def build_month_box(selection):
+    import plotly.graph_objects as go
+
+    # Box statistics per month from the hourly sale counts, so only
+    # the summaries (not every sale) are sent to the browser
+    hour_counts = selection.hour_counts_by_month()
+    stats = box_stats_from_counts(hour_counts.columns, hour_counts)
+    outliers = stats["outliers"].explode().dropna()
+
+    fig = go.Figure(go.Box(
+        x=stats.index,
+        q1=stats["q1"],
+        median=stats["median"],
+        q3=stats["q3"],
+        lowerfence=stats["lowerfence"],
+        upperfence=stats["upperfence"],
+        name="",
+        marker_color="#8B5A2B",
+    ))
+    fig.add_trace(go.Scatter(
+        x=outliers.index,
+        y=outliers.to_numpy(dtype=float),
+        mode="markers",
+        name="",
+        marker_color="#8B5A2B",
+    ))
+
+    fig.update_layout(
+        title="Hourly Sale Time Distribution by Month",
+        xaxis_title="Month",
+        yaxis_title="Hour of Day (24-hour clock)",
+        showlegend=False,
+        margin=dict(l=10, r=10, t=40, b=10),
+    )
+
+    fig.update_yaxes(autorange=True)
+
+    return fig
+
+
+def build_rolling(filters):
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+
+    # Trailing 7- and 28-day totals for each day of the selected window
+    rolling = daily_totals.rolling(*filters, windows=(7, 28))
+
+    fig = make_subplots(rows=2, cols=1, shared_xaxes=True, vertical_spacing=0.08)
+    for n, color in [(7, "#A47148"), (28, "#3B2F2F")]:
+        fig.add_trace(go.Scatter(
+            x=rolling["Date"], y=rolling[f"revenue_{n}d"], mode="lines",
+            name=f"{n}-day", legendgroup=f"{n}d", line_color=color,
+        ), row=1, col=1)
+        fig.add_trace(go.Scatter(
+            x=rolling["Date"], y=rolling[f"sales_{n}d"], mode="lines",
+            name=f"{n}-day", legendgroup=f"{n}d", showlegend=False, line_color=color,
+        ), row=2, col=1)
+
+    fig.update_layout(
+        title="Rolling Revenue and Sales",
+        margin=dict(l=10, r=10, t=40, b=10),
+    )
+    fig.update_yaxes(title_text="Revenue ($)", row=1, col=1)
+    fig.update_yaxes(title_text="Sales", row=2, col=1)
+
+    return fig
+
+
+def build_monthly_bar(selection):
+    import plotly.express as px
+
+    monthly_revenue = selection.revenue_by_month()
+
+    monthly_revenue["Month_Year"] = (
+        monthly_revenue["Month_name"].astype(str) + " " + monthly_revenue["Year"].astype(str)
+    )
+
+    month_order = monthly_revenue["Month_Year"].tolist()
+
+    fig = px.bar(
+        monthly_revenue,
+        x="Month_Year",
+        y="total_revenue",
+        title="Total Revenue by Month (Year-Aware)",
+        text_auto=True,
+        category_orders={"Month_Year": month_order},
+        color_discrete_sequence=["#A47148"],
+    )
+
+    fig.update_layout(
+        xaxis_title="Month (Year)",
+        yaxis_title="Total Revenue ($)",
+        margin=dict(l=10, r=10, t=40, b=10),
+    )
+
+    return fig
+
+
+def compute_filters(filters, profile, executor, cancelled):
+    """Selection, previous-period totals and figures for ``filters`` (runs in the background).
+
+    There is no script run context on the recompute threads, so the rerun's
+    ``profile`` and the figure build ``executor`` are resolved by the
+    caller and nothing here calls Streamlit.
+    """
+    date_range, hour_range, coffees = filters
+
+    # Totals for the selected date window are kept per session and updated
+    # by the days that entered or left the window; the hour and coffee
+    # filters then slice those totals (an empty coffee selection keeps
+    # nothing). With COFFEE_SALES_BACKEND=sqlite/duckdb the same tables come
+    # from SQL instead.
+    with profile.stage("filter") as filter_stage:
+        if query_backend is not None:
+            selection = query_backend.select(date_range, hour_range, coffees)
+        else:
+            aggregates = session_aggregates.get("aggregates")
+            # After a live append the totals are carried over to the extended cells
+            if aggregates is None or (aggregates.cells is not cube_cells and not aggregates.rebase(cube_cells)):
+                aggregates = session_aggregates["aggregates"] = IncrementalAggregates(cube_cells)
+
+            aggregates.set_date_range(date_range)
+            selection = aggregates.select(hour_range, coffees)
+        filter_stage["rows"] = selection.total_sales
+    if cancelled.is_set():
+        return None
+
+    # The previous period of the same length, from running daily totals: two
+    # lookups per total instead of filtering the data a second time. There is
+    # no comparison when it starts before the data does.
+    period_days = (date_range[1] - date_range[0]).days + 1
+    previous_range = (
+        date_range[0] - datetime.timedelta(days=period_days),
+        date_range[0] - datetime.timedelta(days=1),
+    )
+    previous = (None, None)
+    if daily_totals.covers(previous_range):
+        previous = daily_totals.window(previous_range, hour_range, coffees)
+
+    figures = {}
+    if not selection.empty:
+        chart_builds = {
+            f"dashboard_{name}": profile.timed(f"figure:{name}", functools.partial(build, *args))
+            for name, build, args in [
+                ("heatmap", build_heatmap, (selection,)),
+                ("coffee_revenue", build_coffee_bar, (selection,)),
+                ("month_box", build_month_box, (selection,)),
+                ("monthly_revenue", build_monthly_bar, (selection,)),
+                ("rolling", build_rolling, (filters,)),
+            ]
+        }
+        with profile.stage("figures"):
+            figures = figure_cache.get_or_build_many(
+                chart_builds, filters, version, executor, cancelled
+            )
+        if cancelled.is_set():
+            return None
+    return selection, period_days, previous, figures
+
+
+job = recompute.request(
+    (filter_key, version),
+    functools.partial(compute_filters, filter_key, profile, get_figure_executor()),
+)
+if not job.wait(WAIT_SECONDS) and recompute.completed is None:
+    job.wait()  # nothing to show yet
+if job.done():
+    job.future.result()  # re-raise a failed computation here
+shown, stale = recompute.current((filter_key, version))
+if shown is None:
+    st.stop()  # superseded by a newer rerun before anything was computed
+selection, period_days, (previous_revenue, previous_sales), figures = shown.value
+# Sections answered on the script thread use the filters of the results
+# being shown, so a stale page never mixes two filter states
+shown_filters, _ = shown.key
+shown_dates, shown_hours, shown_coffees = shown_filters
+total_revenue = selection.total_revenue
+total_sales = selection.total_sales
+
+if stale:
+    st.info("Showing results for the previous filters while the charts update…", icon="⏳")
+
+    # Rerun once the current filters' results land
+    @st.fragment(run_every=POLL_SECONDS)
+    def wait_for_results():
+        if job.done():
+            st.rerun()
+
+    wait_for_results()
+
+
+def period_delta(current, previous):
+    # st.metric delta text: change versus the previous period, in percent
+    if not previous:
+        return None
+    return f"{(current - previous) / previous:+.1%} vs previous {period_days} days"
 
 # ───────────────────────────
 # ROW 1
@@ -91,33 +409,34 @@ else:
 col1_r1, col2_r1, col3_r1 = st.columns(3)
 
 with col1_r1:
-    if df_filtered.empty:
+    if selection.empty:
         st.metric(label="Total Revenue", value="$0")
     else:
-        total_revenue = df_filtered["money"].sum()
         st.metric(
             label="Total Revenue",
-            value=f"${total_revenue:,.2f}"
+            value=f"${total_revenue:,.2f}",
+            delta=period_delta(total_revenue, previous_revenue),
         )
 
 with col2_r1:
-    if df_filtered.empty:
+    if selection.empty:
         st.metric(label="Avg Revenue / Sale", value="$0")
     else:
-        avg_sale = df_filtered["money"].mean()
+        avg_sale = total_revenue / total_sales
         st.metric(
             label="Avg Revenue / Sale",
-            value=f"${avg_sale:,.2f}"
+            value=f"${avg_sale:,.2f}",
+            delta=period_delta(avg_sale, previous_revenue / previous_sales if previous_sales else None),
         )
 
 with col3_r1:
-    if df_filtered.empty:
+    if selection.empty:
         st.metric(label="Total Sales", value="0")
     else:
-        total_sales = len(df_filtered)
         st.metric(
             label="Total Sales",
-            value=f"{total_sales:,}"
+            value=f"{total_sales:,}",
+            delta=period_delta(total_sales, previous_sales),
         )
 
 
@@ -129,48 +448,10 @@ big_col_r2, col3_r2 = st.columns([2, 1])
 with big_col_r2:
     st.subheader("Sales Heatmap by Day and Hour")
 
-    if df_filtered.empty:
+    if selection.empty:
         st.warning("No data available for the selected filters.")
     else:
-        heatmap_data = (
-            df_filtered.groupby(["Weekday", "Weekdaysort", "hour_of_day"])["money"]
-            .sum()
-            .reset_index()
-        )
-
-        weekday_order = (
-            heatmap_data[["Weekday", "Weekdaysort"]]
-            .drop_duplicates()
-            .sort_values("Weekdaysort")["Weekday"]
-            .tolist()
-        )
-
-        pivot_table = heatmap_data.pivot_table(
-            index="Weekday",
-            columns="hour_of_day",
-            values="money",
-            fill_value=0
-        )
-
-        pivot_table = pivot_table.reindex(index=weekday_order)
-
-        pivot_table = pivot_table[sorted(pivot_table.columns)]
-
-        fig = px.imshow(
-            pivot_table,
-            text_auto=True,
-            aspect="auto",
-            color_continuous_scale=COFFEE_CONTINUOUS,
-            labels=dict(color="Total Revenue ($)")
-        )
-
-        fig.update_layout(
-            xaxis_title="Hour of Day (24-hour clock)",
-            yaxis_title="Day of Week",
-            margin=dict(l=10, r=10, t=40, b=10),
-        )
-
-        st.plotly_chart(fig, use_container_width=True)
+        profile.plotly_chart(figures["dashboard_heatmap"], "heatmap", use_container_width=True)
 
 with col3_r2:
     st.markdown("""
@@ -188,102 +469,21 @@ with col3_r2:
 col1_r3, col2_r3, col3_r3 = st.columns(3)
 
 with col1_r3:
-    if df_filtered.empty:
+    if selection.empty:
         st.warning("No data available for the selected filters.")
     else:
-        # Aggregate revenue by coffee type
-        coffee_revenue = (
-            df_filtered.groupby("coffee_name")["money"]
-            .sum()
-            .reset_index()
-            .sort_values("money", ascending=False)
-        )
-
-        fig = px.bar(
-            coffee_revenue,
-            x="coffee_name",
-            y="money",
-            title="Total Revenue by Coffee Type",
-            text_auto=True,
-            color_discrete_sequence=["#6F4E37"]
-        )
-
-        fig.update_layout(
-            xaxis_title="Coffee Type",
-            yaxis_title="Total Revenue ($)",
-            margin=dict(l=10, r=10, t=40, b=10),
-        )
-
-        st.plotly_chart(fig, use_container_width=True)
+        profile.plotly_chart(figures["dashboard_coffee_revenue"], "coffee_revenue", use_container_width=True)
 
 with col2_r3:
-    if df_filtered.empty:
+    if selection.empty:
         st.warning("No data available for the selected filters.")
     else:
-        month_order = (
-            df_filtered[["Month_name", "Monthsort"]]
-            .drop_duplicates()
-            .sort_values("Monthsort")["Month_name"]
-            .tolist()
-        )
-
-        fig = px.box(
-            df_filtered,
-            x="Month_name",
-            y="hour_of_day",
-            category_orders={"Month_name": month_order},
-            title="Hourly Sale Time Distribution by Month",
-            color_discrete_sequence=["#8B5A2B"],
-        )
-
-        fig.update_layout(
-            xaxis_title="Month",
-            yaxis_title="Hour of Day (24-hour clock)",
-            margin=dict(l=10, r=10, t=40, b=10),
-        )
-
-        fig.update_yaxes(autorange=True)
-
-        st.plotly_chart(fig, use_container_width=True)
+        profile.plotly_chart(figures["dashboard_month_box"], "month_box", use_container_width=True)
 with col3_r3:
-    if df_filtered.empty:
+    if selection.empty:
         st.warning("No data available for the selected filters.")
     else:
-        # Add Year from Date for grouping
-        temp = df_filtered.copy()
-        temp["Year"] = temp["Date"].dt.year
-
-        monthly_revenue = (
-            temp.groupby(["Year", "Month_name", "Monthsort"])["money"]
-            .sum()
-            .reset_index()
-            .rename(columns={"money": "total_revenue"})
-            .sort_values(["Year", "Monthsort"])
-        )
-
-        monthly_revenue["Month_Year"] = (
-            monthly_revenue["Month_name"] + " " + monthly_revenue["Year"].astype(str)
-        )
-
-        month_order = monthly_revenue["Month_Year"].tolist()
-
-        fig = px.bar(
-            monthly_revenue,
-            x="Month_Year",
-            y="total_revenue",
-            title="Total Revenue by Month (Year-Aware)",
-            text_auto=True,
-            category_orders={"Month_Year": month_order},
-            color_discrete_sequence=["#A47148"],
-        )
-
-        fig.update_layout(
-            xaxis_title="Month (Year)",
-            yaxis_title="Total Revenue ($)",
-            margin=dict(l=10, r=10, t=40, b=10),
-        )
-
-        st.plotly_chart(fig, use_container_width=True)
+        profile.plotly_chart(figures["dashboard_monthly_revenue"], "monthly_revenue", use_container_width=True)
 
 # ───────────────────────────
 # ROW 4
@@ -315,12 +515,230 @@ with col3_r4:
 - The gap between high and low revenue months demonstrates meaningful fluctuations in demand.
     """)
 
+# ───────────────────────────
+# ROW 5: ROLLING TOTALS
+# ───────────────────────────
+col1_r5, col2_r5 = st.columns([2, 1])
+
+with col1_r5:
+    if selection.empty:
+        st.warning("No data available for the selected filters.")
+    else:
+        profile.plotly_chart(figures["dashboard_rolling"], "rolling", use_container_width=True)
+
+with col2_r5:
+    st.markdown("""
+- Each point sums the 7 or 28 days up to and including that day, so single busy or quiet days are smoothed out.
+- The 28-day line shows the underlying trend; the 7-day line shows shorter swings around it.
+- The KPI deltas above compare the selected window with the same number of days just before it.
+    """)
 
 # ───────────────────────────
-# FOOTER
+# ROW 6: INTRADAY TRAFFIC
+# ───────────────────────────
+st.subheader("Intraday Traffic")
+
+bin_minutes = st.radio(
+    "Bin size",
+    BIN_MINUTES,
+    index=1,
+    format_func=lambda minutes: f"{minutes} min",
+    horizontal=True,
+    label_visibility="collapsed",
+)
+
+# Minute-level counts from the parsed Time column; every table is one
+# bincount over the matching rows, so this section is answered in the
+# script thread under the shown filters
+with profile.stage("intraday load"):
+    intraday = load_intraday()
+
+
+def build_pressure():
+    import plotly.express as px
+
+    # Expected sales in each time slot: the queue pressure staff have to absorb
+    pressure = intraday.pressure(shown_dates, shown_hours, shown_coffees, bin_minutes)
+
+    fig = px.imshow(
+        pressure,
+        aspect="auto",
+        color_continuous_scale=COFFEE_CONTINUOUS,
+        labels=dict(color="Avg Sales / Day"),
+    )
+
+    fig.update_layout(
+        title=f"Average Sales per {bin_minutes}-Minute Slot",
+        xaxis_title="Time of Day",
+        yaxis_title="Day of Week",
+        margin=dict(l=10, r=10, t=40, b=10),
+    )
+
+    return fig
+
+
+def build_peak_minutes():
+    import plotly.express as px
+
+    peaks = intraday.peak_minutes(shown_dates, shown_hours, shown_coffees)
+
+    fig = px.bar(
+        peaks,
+        x="Weekday",
+        y="max_sales",
+        title="Peak-Minute Throughput by Weekday",
+        text_auto=True,
+        hover_data={"peak_minute": True, "avg_sales": ":.2f"},
+        color_discrete_sequence=["#8B5A2B"],
+    )
+
+    fig.update_layout(
+        xaxis_title="Day of Week",
+        yaxis_title="Most Sales in One Minute",
+        margin=dict(l=10, r=10, t=40, b=10),
+    )
+
+    return fig
+
+
+col1_r6, col2_r6 = st.columns([2, 1])
+
+with col1_r6:
+    if selection.empty:
+        st.warning("No data available for the selected filters.")
+    else:
+        pressure_fig = figure_cache.get_or_build(
+            f"dashboard_pressure_{bin_minutes}",
+            shown_filters,
+            intraday.version,
+            profile.timed("figure:pressure", build_pressure),
+        )
+        profile.plotly_chart(pressure_fig, "pressure", use_container_width=True)
+
+with col2_r6:
+    if selection.empty:
+        st.warning("No data available for the selected filters.")
+    else:
+        peak_fig = figure_cache.get_or_build(
+            "dashboard_peak_minutes",
+            shown_filters,
+            intraday.version,
+            profile.timed("figure:peak_minutes", build_peak_minutes),
+        )
+        profile.plotly_chart(peak_fig, "peak_minutes", use_container_width=True)
+
+st.markdown("""
+- Slots are averaged over every calendar day of that weekday in the date range, so quiet days pull the average down.
+- Bars show the most sales rung up in a single minute on each weekday; hover to see the minute that is busiest on average.
+- Narrower bins reveal short rushes (such as the start of the workday) that hourly views smooth over.
+""")
+
+# ───────────────────────────
+# ROW 7: FORECAST
+# ───────────────────────────
+st.subheader("Revenue Forecast")
+
+forecast_freq = st.radio("Forecast", ["Daily", "Monthly"], horizontal=True, label_visibility="collapsed")
+
+with profile.stage("forecast"):
+    forecasts = load_forecasts()
+model = forecasts.daily if forecast_freq == "Daily" else forecasts.monthly
+
+
+def build_forecast():
+    import plotly.graph_objects as go
+
+    # Recent history of the selected coffees followed by the forecast band
+    if forecast_freq == "Daily":
+        frame = model.forecast(shown_coffees, DAILY_HORIZON, history=8 * 7)
+    else:
+        frame = model.forecast(shown_coffees, MONTHLY_HORIZON, history=12)
+    future = frame.dropna(subset=["forecast"])
+
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=future["Date"], y=future["upper"], mode="lines", line_width=0, showlegend=False, hoverinfo="skip",
+    ))
+    fig.add_trace(go.Scatter(
+        x=future["Date"], y=future["lower"], mode="lines", line_width=0, fill="tonexty",
+        fillcolor="rgba(193, 154, 107, 0.35)", name="80% band",
+    ))
+    fig.add_trace(go.Scatter(
+        x=frame["Date"], y=frame["revenue"], mode="lines+markers", name="Revenue", marker_color="#6F4E37",
+    ))
+    fig.add_trace(go.Scatter(
+        x=future["Date"], y=future["forecast"], mode="lines", name="Forecast",
+        line=dict(color="#A47148", dash="dash"),
+    ))
+
+    fig.update_layout(
+        xaxis_title="Date" if forecast_freq == "Daily" else "Month",
+        yaxis_title="Revenue ($)",
+        margin=dict(l=10, r=10, t=40, b=10),
+    )
+
+    return fig
+
+
+col1_r7, col2_r7 = st.columns([2, 1])
+
+with col1_r7:
+    if model is None:
+        st.info("Not enough history to forecast at this granularity yet.")
+    elif not shown_coffees:
+        st.warning("No data available for the selected filters.")
+    else:
+        forecast_fig = figure_cache.get_or_build(
+            f"dashboard_forecast_{forecast_freq.lower()}",
+            (shown_coffees,),
+            forecasts.version,
+            profile.timed("figure:forecast", build_forecast),
+        )
+        profile.plotly_chart(forecast_fig, "forecast", use_container_width=True)
+
+with col2_r7:
+    st.markdown("""
+- Forecasts use each coffee type's full history; only the coffee type filter applies to this chart.
+- Daily forecasts follow the weekly pattern; monthly forecasts follow the trend of completed months.
+- The band shows where 80% of outcomes are expected to fall, and widens further ahead.
+    """)
+
+# ───────────────────────────
+# EXPORT
 # ───────────────────────────
-st.divider()
-st.caption("**Data source:** https://www.kaggle.com/datasets/kainatjamil12/coffe-sale/data")
-local_time = datetime.datetime.now(ZoneInfo("America/Denver"))
-last_refreshed = local_time.strftime("%Y-%m-%d %I:%M %p")
-st.caption(f"Last refreshed: {last_refreshed} (local time)")
+with st.expander("Export filtered view"):
+    export_choice = st.selectbox("Data", ["Filtered transactions", *EXPORT_TABLES])
+    export_format = st.radio("Format", list(EXPORT_FORMATS), horizontal=True)
+    export_compressed = st.checkbox("Compress", help="gzip for CSV, zstd for Parquet.")
+
+    export_fmt = EXPORT_FORMATS[export_format][0]
+    export_name, export_mime = export_file_name(
+        "coffee_sales_" + export_choice.lower().replace(" ", "_"),
+        export_fmt,
+        export_compressed,
+    )
+
+    # Runs only when the button is clicked; transactions are read and written
+    # to a temporary file one batch at a time, so memory stays bounded for
+    # large selections
+    def build_export():
+        if export_choice == "Filtered transactions":
+            # Date and coffee filters are pushed down to the data files; the
+            # hour filter is applied to each batch
+            batches = iter_sales_chunks(
+                chunk_rows=EXPORT_CHUNK_ROWS, date_range=date_range, coffees=selected_coffees
+            )
+            chunks = (batch[batch["hour_of_day"].between(*hour_range)] for batch in batches)
+        else:
+            chunks = [EXPORT_TABLES[export_choice](selection)]
+        return export_file(chunks, export_fmt, export_compressed)
+
+    st.download_button(
+        label="📥 Download",
+        data=build_export,
+        file_name=export_name,
+        mime=export_mime,
+        disabled=stale or selection.empty,
+    )
+
+render_footer()
@@ -1,18 +1,28 @@
 import streamlit as st
-import pandas as pd
-import altair as alt
-import plotly.express as px
-import matplotlib.pyplot as plt
-import seaborn as sns
 import numpy as np
-from pathlib import Path
+from anomalies import TOTAL_SERIES, load_anomalies
+from downsample import downsample_series
+from figure_cache import get_figure_cache
+from sales_cube import cube_version, load_daily_sales
+from sales_data import DATA_PATH, data_version, load_sales
+from sales_filters import SalesFilter
 
+# The chart builds import plotly.express themselves, so a rerun whose
+# figures are all cached never loads it.
 
-DATA_PATH = Path(__file__).parent.parent / "data" / "Coffee_sales.csv"
-df = pd.read_csv(DATA_PATH)
+
+df = load_sales(columns=[
+    "cents", "coffee_name", "Weekday", "Weekdaysort", "hour_of_day",
+])
 
 COFFEE_COLORS = ["#6F4E37", "#8B5A2B", "#A47148", "#C19A6B", "#D2B48C", "#F6E2B3"]
 
+# Most points the daily revenue line sends to the browser
+DAILY_POINT_BUDGET = 500
+
+# Rows per page of the data preview
+PREVIEW_PAGE_ROWS = 500
+
 st.set_page_config(
     page_title="Coffee Sales EDA Gallery",
     page_icon="☕",
@@ -22,6 +32,10 @@ st.set_page_config(
 
 st.title("Coffee Sales EDA Gallery")
 
+# Built figures are reused across reruns and sessions until the data changes
+figure_cache = get_figure_cache()
+version = data_version()
+
 # ───────────────────────────
 # ROW 1
 # ───────────────────────────
@@ -29,48 +43,97 @@ big_col_r1, col3_r1 = st.columns([2, 1])
 
 with big_col_r1:
     st.subheader("Daily Coffee Revenue Over Time")
-    df["Date"] = pd.to_datetime(df["Date"])
 
-    daily_sales = (
-        df.groupby(df["Date"].dt.date)["money"]
-        .sum()
-        .reset_index()
-        .rename(columns={"Date": "Date", "money": "Total_Revenue"})
-    )
-
-    chart_placeholder = st.empty()
-    slider_placeholder = st.empty()
-
-    min_date = daily_sales["Date"].min()
-    max_date = daily_sales["Date"].max()
-
-    start_date, end_date = slider_placeholder.slider(
-        "Select date range to display",
-        min_value=min_date,
-        max_value=max_date,
-        value=(min_date, max_date),
-        format="YYYY-MM-DD",
-    )
-
-    mask = (daily_sales["Date"] >= start_date) & (daily_sales["Date"] <= end_date)
-    filtered_sales = daily_sales[mask]
-
-    fig = px.line(
-        filtered_sales,
-        x="Date",
-        y="Total_Revenue",
-        markers=True,
-        title=""
-    )
-    fig.update_layout(
-        xaxis_title="Date",
-        yaxis_title="Total Revenue ($)",
-        hovermode="x unified",
-        margin=dict(l=10, r=10, t=40, b=10),
-    )
-    fig.update_traces(line_color="#6F4E37")
-
-    chart_placeholder.plotly_chart(fig, use_container_width=True)
+    # Runs as a fragment: moving the slider reruns only this chart
+    @st.fragment
+    def daily_revenue_section():
+        # Version first: the daily totals may be refreshed live in between
+        daily_version = cube_version()
+        daily_sales = load_daily_sales()
+        anomalies = load_anomalies(daily_version)
+
+        chart_placeholder = st.empty()
+        slider_placeholder = st.empty()
+        caption_placeholder = st.empty()
+
+        min_date = daily_sales["Date"].min().date()
+        max_date = daily_sales["Date"].max().date()
+
+        start_date, end_date = slider_placeholder.slider(
+            "Select date range to display",
+            min_value=min_date,
+            max_value=max_date,
+            value=(min_date, max_date),
+            format="YYYY-MM-DD",
+        )
+
+        filtered_sales = SalesFilter(daily_sales).apply(date_range=(start_date, end_date))
+        flagged_days = anomalies.flagged(TOTAL_SERIES, (start_date, end_date))
+
+        # Long ranges are thinned to the point budget, keeping the peaks and dips
+        if len(filtered_sales) > DAILY_POINT_BUDGET:
+            caption_placeholder.caption(
+                f"Showing {DAILY_POINT_BUDGET:,} of {len(filtered_sales):,} days; "
+                "narrow the date range to see every day."
+            )
+
+        def build_daily_line():
+            import plotly.express as px
+
+            plotted_sales = downsample_series(
+                filtered_sales, "Date", "Total_Revenue", DAILY_POINT_BUDGET
+            )
+
+            fig = px.line(
+                plotted_sales,
+                x="Date",
+                y="Total_Revenue",
+                markers=True,
+                title=""
+            )
+            fig.update_layout(
+                xaxis_title="Date",
+                yaxis_title="Total Revenue ($)",
+                hovermode="x unified",
+                margin=dict(l=10, r=10, t=40, b=10),
+            )
+            fig.update_traces(line_color="#6F4E37")
+
+            # Flagged days are drawn even where the line was thinned out
+            for name, rows, symbol, color in [
+                ("Spike", flagged_days[flagged_days["score"] > 0], "triangle-up", "#C0392B"),
+                ("Dip", flagged_days[flagged_days["score"] < 0], "triangle-down", "#2E86C1"),
+            ]:
+                fig.add_scatter(
+                    x=rows["Date"],
+                    y=rows["revenue"],
+                    mode="markers",
+                    name=name,
+                    marker=dict(symbol=symbol, size=11, color=color),
+                    customdata=rows["expected"],
+                    hovertemplate=f"{name}: $%{{y:,.2f}} (expected $%{{customdata:,.2f}})<extra></extra>",
+                )
+
+            return fig
+
+        fig = figure_cache.get_or_build(
+            "eda_daily_revenue", (start_date, end_date), daily_version, build_daily_line
+        )
+        chart_placeholder.plotly_chart(fig, use_container_width=True)
+
+        coffee_flags = anomalies.flagged(anomalies.coffee_types, (start_date, end_date))
+        with st.expander(f"Flagged days by coffee type ({len(coffee_flags):,} in range)"):
+            st.dataframe(
+                coffee_flags.sort_values("Date", ascending=False).rename(columns={
+                    "series": "Coffee Type",
+                    "revenue": "Revenue ($)",
+                    "expected": "Expected ($)",
+                    "score": "Robust z-score",
+                }),
+                hide_index=True,
+            )
+
+    daily_revenue_section()
 
 with col3_r1:
     st.markdown("""
@@ -82,6 +145,7 @@ with col3_r1:
 - The y-axis shows the total revenue earned from coffee sales on each day.
 - Each point represents a full day of revenue.
 - Use the slider below the chart to zoom into a specific date range (for example, one week or a month).
+- Red triangles mark unusually high days and blue triangles unusually low ones, compared with the same weekday over the previous eight weeks (median and median absolute deviation).
 
 **Insights from the data**
 - Revenue fluctuates very noticeably between days, indicating natural peaks and slower periods.
@@ -96,61 +160,84 @@ with col3_r1:
 col1_r2, col2_r2, col3_r2 = st.columns(3)
 
 with col1_r2:
-    coffee_counts = df["coffee_name"].value_counts().reset_index()
-    coffee_counts.columns = ["Coffee_Type", "Count"]
-
-    fig = px.pie(
-        coffee_counts,
-        names="Coffee_Type",
-        values="Count",
-        title="Distribution of Coffee Types Sold",
-        hole=0.3,
-        color_discrete_sequence=COFFEE_COLORS
-    )
+    def build_coffee_pie():
+        import plotly.express as px
 
-    fig.update_traces(
-        textposition="inside",
-        textinfo="percent+label"
-    )
+        coffee_counts = df["coffee_name"].value_counts().reset_index()
+        coffee_counts.columns = ["Coffee_Type", "Count"]
 
-    st.plotly_chart(fig, use_container_width=True)
+        fig = px.pie(
+            coffee_counts,
+            names="Coffee_Type",
+            values="Count",
+            title="Distribution of Coffee Types Sold",
+            hole=0.3,
+            color_discrete_sequence=COFFEE_COLORS
+        )
 
-with col2_r2:
-    weekday_sales = df.groupby(["Weekday", "Weekdaysort"])["money"].sum().reset_index()
-    weekday_sales = weekday_sales.sort_values("Weekdaysort")  # ensures correct order
-
-    fig = px.bar(
-        weekday_sales,
-        x="Weekday",
-        y="money",
-        title="Total Revenue by Weekday",
-        text_auto=True,
-        color_discrete_sequence=["#6F4E37"] 
-    )
+        fig.update_traces(
+            textposition="inside",
+            textinfo="percent+label"
+        )
 
-    fig.update_layout(
-        xaxis_title="Day of Week",
-        yaxis_title="Total Revenue ($)",
-        showlegend=False
-    )
+        return fig
 
+    fig = figure_cache.get_or_build("eda_coffee_pie", (), version, build_coffee_pie)
     st.plotly_chart(fig, use_container_width=True)
 
-with col3_r2:
-    fig = px.histogram(
-        df,
-        x="hour_of_day",
-        nbins=24,  # one bin per hour
-        title="Sales Activity by Time of Day",
-        color_discrete_sequence=["#A47148"]
-    )
-
-    fig.update_layout(
-        xaxis_title="Hour of Day (24-hour format)",
-        yaxis_title="Number of Sales",
-        bargap=0.05
-    )
+with col2_r2:
+    def build_weekday_bar():
+        import plotly.express as px
+
+        weekday_sales = df.groupby(["Weekday", "Weekdaysort"], observed=True)["cents"].sum().reset_index()
+        weekday_sales = weekday_sales.sort_values("Weekdaysort")  # ensures correct order
+        weekday_sales["money"] = weekday_sales["cents"] / 100
+
+        fig = px.bar(
+            weekday_sales,
+            x="Weekday",
+            y="money",
+            title="Total Revenue by Weekday",
+            text_auto=True,
+            color_discrete_sequence=["#6F4E37"] 
+        )
+
+        fig.update_layout(
+            xaxis_title="Day of Week",
+            yaxis_title="Total Revenue ($)",
+            showlegend=False
+        )
+
+        return fig
+
+    fig = figure_cache.get_or_build("eda_weekday_revenue", (), version, build_weekday_bar)
+    st.plotly_chart(fig, use_container_width=True)
 
+with col3_r2:
+    def build_hour_histogram():
+        import plotly.express as px
+
+        # Pre-binned: one count per hour from the first to the last hour with sales
+        hour_counts = np.bincount(df["hour_of_day"].to_numpy(dtype=np.intp), minlength=24)
+        hours = np.flatnonzero(hour_counts)
+        hours = np.arange(hours.min(), hours.max() + 1) if len(hours) else hours
+
+        fig = px.bar(
+            x=hours,
+            y=hour_counts[hours],
+            title="Sales Activity by Time of Day",
+            color_discrete_sequence=["#A47148"]
+        )
+
+        fig.update_layout(
+            xaxis_title="Hour of Day (24-hour format)",
+            yaxis_title="Number of Sales",
+            bargap=0.05
+        )
+
+        return fig
+
+    fig = figure_cache.get_or_build("eda_hour_histogram", (), version, build_hour_histogram)
     st.plotly_chart(fig, use_container_width=True)
 
 # ───────────────────────────
@@ -217,14 +304,33 @@ st.divider()
 # Footer
 st.caption("**Data source:** https://www.kaggle.com/datasets/kainatjamil12/coffe-sale/data")
 
-with st.expander("Data Preview"):
-    st.dataframe(df)
-
-# Read the CSV file for download
-csv_data = df.to_csv(index=False).encode('utf-8')
-st.download_button(
-    label="📥 Download Raw Data (CSV)",
-    data=csv_data,
-    file_name="Coffee_sales.csv",
-    mime="text/csv",
-)
+# The preview only loads and renders data while the expander is open, one
+# page at a time
+@st.fragment
+def data_preview():
+    preview = st.expander("Data Preview", key="eda_data_preview", on_change="rerun")
+    if not preview.open:
+        return
+
+    with preview:
+        full_df = load_sales()
+        n_pages = max(1, -(-len(full_df) // PREVIEW_PAGE_ROWS))
+        page = st.number_input("Page", min_value=1, max_value=n_pages, value=1, key="eda_preview_page")
+
+        first_row = (page - 1) * PREVIEW_PAGE_ROWS
+        page_rows = full_df.iloc[first_row:first_row + PREVIEW_PAGE_ROWS]
+        st.dataframe(page_rows)
+        st.caption(f"Rows {first_row + 1:,}–{first_row + len(page_rows):,} of {len(full_df):,}")
+
+
+data_preview()
+
+# The raw CSV file is only read when the button is clicked (a partitioned
+# dataset directory has no single file to offer)
+if DATA_PATH.is_file():
+    st.download_button(
+        label="📥 Download Raw Data (CSV)",
+        data=DATA_PATH.read_bytes,
+        file_name="Coffee_sales.csv",
+        mime="text/csv",
+    )
@@ -19,6 +19,8 @@ Here are several concrete directions I would pursue next with this project:
 - Experiment with part A and B layouts, such as swapping the main heatmap with a time-series view, to see which arrangement users find more intuitive for answering business questions.
 - Perform an accessibility audit on color choices and font sizes to better support users with vision disabilities.
 - Add user-facing export and annotation features, allowing users perform actions such as downloading filtered views and capture snapshots.
+- Extend the revenue forecasts (now on the Dashboard) with holiday and promotion effects, and forecast demand in cups as well as revenue.
+- Explain the flagged revenue spikes and dips (now on the EDA Gallery) with known events such as holidays or closures, so expected ones are no longer flagged.
     """
 )
 
@@ -0,0 +1,97 @@
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+
+import streamlit as st
+
+# While an earlier state is still being computed, a new one is only computed
+# once it has been left unchanged this long, so the states a slider passes
+# through while being dragged are skipped. Otherwise it starts at once.
+DEBOUNCE_SECONDS = float(os.environ.get("COFFEE_SALES_DEBOUNCE_SECONDS", "0.15"))
+# How long a rerun waits for its results before showing the previous ones,
+# marked stale, and polling every POLL_SECONDS until the new ones land.
+WAIT_SECONDS = float(os.environ.get("COFFEE_SALES_WAIT_SECONDS", "0.5"))
+POLL_SECONDS = 0.25
+
+RECOMPUTE_WORKERS = int(os.environ.get("COFFEE_SALES_RECOMPUTE_WORKERS", "4"))
+
+
+class RecomputeJob:
+    """One requested filter state. ``cancelled`` is set once a newer state supersedes it."""
+
+    def __init__(self, key, generation: int):
+        self.key = key
+        self.generation = generation
+        self.cancelled = threading.Event()
+        self.future = Future()
+        self.value = None
+
+    def done(self) -> bool:
+        return self.future.done()
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """Wait up to ``timeout`` seconds for the job to finish; return whether it has."""
+        done, _ = wait([self.future], timeout)
+        return bool(done)
+
+
+class BackgroundRecompute:
+    """Computes one session's filter results off the script thread; the newest request wins.
+
+    ``request(key, compute)`` returns the job for ``key``, starting it
+    unless it is already the latest. If the previous job has not finished
+    yet, the new one first waits DEBOUNCE_SECONDS and is dropped if a
+    newer request arrives meanwhile; a job that passes runs
+    ``compute(cancelled)``, which should check the ``cancelled`` event
+    between expensive steps and return None once it is set. Jobs of a
+    session run one at a time, so ``compute`` may update per-session state.
+    ``completed`` is the most recent job that finished with a value; the
+    page shows it, marked stale, while a newer job is still running.
+    """
+
+    def __init__(self, executor: ThreadPoolExecutor):
+        self.executor = executor
+        self.latest = None
+        self.completed = None
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._run_lock = threading.Lock()
+
+    def request(self, key, compute) -> RecomputeJob:
+        with self._lock:
+            if self.latest is not None and self.latest.key == key and not self.latest.cancelled.is_set():
+                return self.latest
+            debounce = self.latest is not None and not self.latest.done()
+            if self.latest is not None:
+                self.latest.cancelled.set()
+            self._generation += 1
+            job = self.latest = RecomputeJob(key, self._generation)
+        self.executor.submit(self._run, job, compute, debounce)
+        return job
+
+    def _run(self, job: RecomputeJob, compute, debounce: bool) -> None:
+        try:
+            if debounce and job.cancelled.wait(DEBOUNCE_SECONDS):
+                job.future.set_result(None)
+                return
+            with self._run_lock:
+                value = None if job.cancelled.is_set() else compute(job.cancelled)
+            if value is not None:
+                job.value = value
+                with self._lock:
+                    if self.completed is None or job.generation > self.completed.generation:
+                        self.completed = job
+            job.future.set_result(value)
+        except BaseException as error:
+            job.future.set_exception(error)
+
+    def current(self, key) -> tuple[RecomputeJob | None, bool]:
+        """Return the job to show for ``key`` and whether it is stale (for an older key)."""
+        completed = self.completed
+        return completed, completed is None or completed.key != key
+
+
+@st.cache_resource(show_spinner=False)
+def get_recompute_executor() -> ThreadPoolExecutor:
+    """Return the process-wide pool that runs the sessions' recompute jobs."""
+    return ThreadPoolExecutor(max_workers=RECOMPUTE_WORKERS, thread_name_prefix="recompute")
@@ -0,0 +1,362 @@
+import threading
+import weakref
+import numpy as np
+import pandas as pd
+from sales_filters import SalesFilter
+
+
+def _cell_totals(cells, cents, sales, shape) -> tuple[np.ndarray, np.ndarray]:
+    # Dense (coffee, weekday, hour, month) sums of the given cube rows
+    size = int(np.prod(shape))
+    return (
+        np.rint(np.bincount(cells, weights=cents, minlength=size)).astype(np.int64).reshape(shape),
+        np.rint(np.bincount(cells, weights=sales, minlength=size)).astype(np.int64).reshape(shape),
+    )
+
+
+class CubeCells:
+    """Cube rows flattened to dense-array cell numbers, shared by all sessions.
+
+    Each cube row maps to one cell of a (coffee, weekday, hour, month) array;
+    revenue is kept in cents so that sums and differences are exact.
+    ``version`` identifies the data the cells were built from, and
+    ``total_cents``/``total_sales`` are the dense totals of the whole cube,
+    which sessions showing the full date range share.
+
+    When ``base`` is given and the cube's first ``shared_rows`` rows are
+    the same as base's (as after a live append), the arrays of those rows
+    are reused, and so are the per-session totals (see
+    ``IncrementalAggregates.rebase``), as long as the coffee types and month
+    span did not change.
+    """
+
+    def __init__(self, cube_filter: SalesFilter, version: str = "", base: "CubeCells | None" = None, shared_rows: int = 0):
+        cube = cube_filter.df
+        self.cube_filter = cube_filter
+        self.version = version
+        self.coffee_types = list(cube_filter.coffee_types)
+
+        # The cube is sorted by Date, so its first and last rows span the months
+        first_month, n_months = 0, 0
+        if len(cube):
+            first, last = cube["Date"].iloc[0], cube["Date"].iloc[-1]
+            first_month = first.year * 12 + first.month - 1
+            n_months = last.year * 12 + last.month - first_month
+        self.shape = (len(self.coffee_types), 7, 24, n_months)
+
+        if base is None or base.shape != self.shape or base.coffee_types != self.coffee_types:
+            base, shared_rows = None, 0
+        self.shared_rows = shared_rows
+        self._base = weakref.ref(base) if base is not None else None
+
+        new = cube.iloc[shared_rows:]
+        months = new["Date"].dt.year * 12 + new["Date"].dt.month - 1
+        coffee = new["coffee_name"].astype("category").cat.codes.to_numpy(np.int64)
+        weekday = new["Weekdaysort"].to_numpy(np.int64) - 1
+        hour = new["hour_of_day"].to_numpy(np.int64)
+        month = months.to_numpy(np.int64) - first_month
+        self.cells = np.ravel_multi_index((coffee, weekday, hour, month), self.shape)
+        self.cents = np.rint(new["revenue"].to_numpy() * 100).astype(np.int64)
+        self.sales = new["sales"].to_numpy(np.int64)
+        if base is not None:
+            self.cells = np.concatenate([base.cells[:shared_rows], self.cells])
+            self.cents = np.concatenate([base.cents[:shared_rows], self.cents])
+            self.sales = np.concatenate([base.sales[:shared_rows], self.sales])
+        if base is not None:
+            # The base totals, minus its rows that were merged again, plus the new rows
+            old_cents, old_sales = _cell_totals(
+                base.cells[shared_rows:], base.cents[shared_rows:], base.sales[shared_rows:], self.shape
+            )
+            new_cents, new_sales = _cell_totals(
+                self.cells[shared_rows:], self.cents[shared_rows:], self.sales[shared_rows:], self.shape
+            )
+            self.total_cents = base.total_cents - old_cents + new_cents
+            self.total_sales = base.total_sales - old_sales + new_sales
+        else:
+            self.total_cents, self.total_sales = _cell_totals(self.cells, self.cents, self.sales, self.shape)
+
+        # Shared by every session: make accidental in-place updates fail loudly
+        for array in (self.cells, self.cents, self.sales, self.total_cents, self.total_sales):
+            array.flags.writeable = False
+        if base is not None and None not in base.weekday_labels and base.months["Month_name"].notna().all():
+            self.weekday_labels, self.months = base.weekday_labels, base.months
+            return
+
+        # Labels for the weekday and month axes
+        weekdays = cube[["Weekdaysort", "Weekday"]].drop_duplicates("Weekdaysort")
+        self.weekday_labels = [None] * 7
+        for sort, name in zip(weekdays["Weekdaysort"], weekdays["Weekday"]):
+            self.weekday_labels[int(sort) - 1] = str(name)
+
+        month_names = cube[["Monthsort", "Month_name"]].drop_duplicates("Monthsort")
+        names = dict(zip(month_names["Monthsort"].astype(int), month_names["Month_name"].astype(str)))
+        month_index = np.arange(first_month, first_month + n_months)
+        self.months = pd.DataFrame({"Year": month_index // 12, "Monthsort": month_index % 12 + 1})
+        self.months["Month_name"] = self.months["Monthsort"].map(names)
+
+    def extends(self, other: "CubeCells") -> bool:
+        """Whether these cells were built on ``other`` and share its first ``shared_rows`` rows."""
+        return self._base is not None and self._base() is other
+
+
+class IncrementalAggregates:
+    """Dashboard totals for one date window, updated by deltas as the window moves.
+
+    Revenue and sale counts of the cube cells inside the window are kept in
+    dense (coffee, weekday, hour, month) arrays. Moving the date window only
+    adds the days that entered and subtracts the days that left; hour and
+    coffee filters are answered by slicing the arrays in ``select``, so
+    neither touches the cube. One instance is kept per session; while its
+    window covers the whole cube it uses the totals shared in ``cells`` and
+    holds no arrays of its own.
+    """
+
+    def __init__(self, cells: CubeCells):
+        self.cells = cells
+        self._share_totals()
+
+    def _share_totals(self) -> None:
+        self.cents, self.sales = self.cells.total_cents, self.cells.total_sales
+        self._rows = slice(0, len(self.cells.cells))
+
+    def _add_rows(self, start: int, stop: int, sign: int) -> None:
+        if start >= stop:
+            return
+        if not self.cents.flags.writeable:
+            # First change away from the shared totals
+            self.cents, self.sales = self.cents.copy(), self.sales.copy()
+        rows = slice(start, stop)
+        cents, sales = _cell_totals(
+            self.cells.cells[rows], self.cells.cents[rows], self.cells.sales[rows], self.cents.shape
+        )
+        self.cents += sign * cents
+        self.sales += sign * sales
+
+    def set_date_range(self, date_range) -> None:
+        """Move the window to ``date_range``, touching only the cube rows that changed."""
+        new = self.cells.cube_filter.date_slice(*date_range)
+        old = self._rows
+        if new == old:
+            return
+        if new == slice(0, len(self.cells.cells)):
+            self._share_totals()
+            return
+
+        overlap_start, overlap_stop = max(old.start, new.start), min(old.stop, new.stop)
+        changed = (new.stop - new.start) + (old.stop - old.start) - 2 * max(overlap_stop - overlap_start, 0)
+        if overlap_start >= overlap_stop or changed >= new.stop - new.start:
+            # Rebuilding is cheaper than applying a delta this large
+            self.cents = np.zeros(self.cells.shape, dtype=np.int64)
+            self.sales = np.zeros(self.cells.shape, dtype=np.int64)
+            self._add_rows(new.start, new.stop, 1)
+        else:
+            self._add_rows(old.start, new.start, -1)
+            self._add_rows(new.start, old.start, 1)
+            self._add_rows(new.stop, old.stop, -1)
+            self._add_rows(old.stop, new.stop, 1)
+        self._rows = new
+
+    def rebase(self, cells: CubeCells) -> bool:
+        """Switch to ``cells`` if they extend the current ones, keeping the totals.
+
+        Only the rows past ``cells.shared_rows`` that were in the window are
+        taken out; ``set_date_range`` then adds the new rows that fall in
+        it. Returns False (and changes nothing) when a rebuild is needed,
+        or when the shared totals of ``cells`` can be used instead.
+        """
+        if not cells.extends(self.cells) or self.cents is self.cells.total_cents:
+            return False
+        keep = cells.shared_rows
+        self._add_rows(max(self._rows.start, keep), self._rows.stop, -1)
+        self._rows = slice(min(self._rows.start, keep), min(self._rows.stop, keep))
+        self.cells = cells
+        return True
+
+    def select(self, hour_range, coffees) -> "AggregateView":
+        """Return the totals restricted to ``hour_range`` and the ``coffees`` listed."""
+        start_hour, end_hour = hour_range
+        coffee_types = self.cells.coffee_types
+        coffee_index = [coffee_types.index(c) for c in coffees if c in coffee_types]
+        hours = slice(max(start_hour, 0), end_hour + 1)
+        return AggregateView(
+            self.cells,
+            self.cents[coffee_index, :, hours, :],
+            self.sales[coffee_index, :, hours, :],
+            [coffee_types[i] for i in coffee_index],
+            np.arange(24)[hours],
+        )
+
+
+class AggregateView:
+    """Chart-ready tables for one hour/coffee selection of an IncrementalAggregates."""
+
+    def __init__(self, cells, cents, sales, coffee_types, hours):
+        self._cells = cells
+        self._cents = cents
+        self._sales = sales
+        self._coffee_types = coffee_types
+        self._hours = hours
+        self.total_revenue = int(cents.sum()) / 100
+        self.total_sales = int(sales.sum())
+        self.empty = self.total_sales == 0
+
+    def revenue_by_weekday_hour(self) -> pd.DataFrame:
+        """Weekday x hour revenue table, limited to the weekdays and hours with sales."""
+        cents = self._cents.sum(axis=(0, 3))
+        sales = self._sales.sum(axis=(0, 3))
+        weekdays = np.flatnonzero(sales.sum(axis=1))
+        hours = np.flatnonzero(sales.sum(axis=0))
+        return pd.DataFrame(
+            cents[np.ix_(weekdays, hours)] / 100,
+            index=pd.Index([self._cells.weekday_labels[w] for w in weekdays], name="Weekday"),
+            columns=pd.Index(self._hours[hours], name="hour_of_day"),
+        )
+
+    def revenue_by_coffee(self) -> pd.DataFrame:
+        cents = self._cents.sum(axis=(1, 2, 3))
+        has_sales = self._sales.sum(axis=(1, 2, 3)) > 0
+        return pd.DataFrame({
+            "coffee_name": np.array(self._coffee_types, dtype=object)[has_sales],
+            "money": cents[has_sales] / 100,
+        })
+
+    def revenue_by_month(self) -> pd.DataFrame:
+        """Year-aware monthly revenue, in calendar order."""
+        cents = self._cents.sum(axis=(0, 1, 2))
+        has_sales = self._sales.sum(axis=(0, 1, 2)) > 0
+        monthly = self._cells.months[has_sales].reset_index(drop=True)
+        monthly["total_revenue"] = cents[has_sales] / 100
+        return monthly
+
+    def hour_counts_by_month(self) -> pd.DataFrame:
+        """Number of sales per hour of day (columns) for each Month_name (rows, calendar order)."""
+        months = self._cells.months
+        counts = pd.DataFrame(self._sales.sum(axis=(0, 1)).T, columns=self._hours)
+        return (
+            counts.groupby([months["Monthsort"], months["Month_name"]])
+            .sum()
+            .droplevel("Monthsort")
+        )
+
+
+class DailyTotals:
+    """Running totals per day of a CubeCells cube, for windows of any length in O(1) days.
+
+    ``cents``/``sales`` are cumulative over days and dense over (coffee,
+    hour): row ``d`` holds the totals of the days before day ``d``, so the
+    totals of days [a, b) are row b minus row a, whatever the window
+    length. Shared by all sessions, like the cells.
+    """
+
+    def __init__(self, cells: CubeCells):
+        cube = cells.cube_filter.df
+        self.coffee_types = cells.coffee_types
+        self.first_day = cube["Date"].iloc[0].date() if len(cube) else None
+        days = (cube["Date"] - cube["Date"].iloc[0]).dt.days.to_numpy(np.int64) if len(cube) else np.zeros(0, np.int64)
+        self.n_days = int(days[-1]) + 1 if len(days) else 0
+
+        shape = (self.n_days, len(self.coffee_types), 24)
+        coffee = cube["coffee_name"].astype("category").cat.codes.to_numpy(np.int64)
+        index = np.ravel_multi_index((days, coffee, cube["hour_of_day"].to_numpy(np.int64)), shape)
+        cents, sales = _cell_totals(index, cells.cents, cells.sales, shape)
+        self.cents = np.concatenate([np.zeros((1,) + shape[1:], np.int64), cents.cumsum(axis=0)])
+        self.sales = np.concatenate([np.zeros((1,) + shape[1:], np.int64), sales.cumsum(axis=0)])
+        for array in (self.cents, self.sales):
+            array.flags.writeable = False
+
+    def _day(self, date) -> int:
+        return (date - self.first_day).days
+
+    def _days(self, date_range) -> tuple[int, int]:
+        # Row numbers bounding the days of date_range, clamped to the data
+        start = min(max(self._day(date_range[0]), 0), self.n_days)
+        stop = min(max(self._day(date_range[1]) + 1, 0), self.n_days)
+        return start, max(start, stop)
+
+    def _cells(self, hour_range, coffees) -> tuple:
+        start_hour, end_hour = hour_range
+        coffee_index = [self.coffee_types.index(c) for c in coffees if c in self.coffee_types]
+        return coffee_index, slice(max(start_hour, 0), end_hour + 1)
+
+    def covers(self, date_range) -> bool:
+        """Whether every day of ``date_range`` lies within the data."""
+        return self.n_days > 0 and 0 <= self._day(date_range[0]) and self._day(date_range[1]) < self.n_days
+
+    def window(self, date_range, hour_range, coffees) -> tuple[float, int]:
+        """Return (revenue, sales) of the days in ``date_range`` for the selected hours and coffees."""
+        coffee_index, hours = self._cells(hour_range, coffees)
+        start, stop = self._days(date_range)
+        cents = self.cents[stop, coffee_index, hours].sum() - self.cents[start, coffee_index, hours].sum()
+        sales = self.sales[stop, coffee_index, hours].sum() - self.sales[start, coffee_index, hours].sum()
+        return int(cents) / 100, int(sales)
+
+    def rolling(self, date_range, hour_range, coffees, windows=(7, 28)) -> pd.DataFrame:
+        """Trailing ``windows``-day revenue and sale counts for each day of ``date_range``.
+
+        Columns are ``revenue_<n>d`` and ``sales_<n>d``; a window that
+        reaches back before the first day of data is NaN.
+        """
+        coffee_index, hours = self._cells(hour_range, coffees)
+        cents = self.cents[:, coffee_index, hours].sum(axis=(1, 2))
+        sales = self.sales[:, coffee_index, hours].sum(axis=(1, 2))
+        start, stop = self._days(date_range)
+        ends = np.arange(start, stop) + 1
+        rolling = pd.DataFrame({"Date": pd.to_datetime(self.first_day) + pd.to_timedelta(ends - 1, unit="D")})
+        for n in windows:
+            starts = ends - n
+            complete = starts >= 0
+            starts = np.maximum(starts, 0)
+            rolling[f"revenue_{n}d"] = np.where(complete, (cents[ends] - cents[starts]) / 100, np.nan)
+            rolling[f"sales_{n}d"] = np.where(complete, sales[ends] - sales[starts], np.nan)
+        return rolling
+
+
+def revenue_tables(cube: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Return daily and monthly revenue per coffee type (columns), with no gaps in the dates.
+
+    The month of the last day is left out of the monthly table unless
+    that day ends it.
+    """
+    coffees = sorted(cube["coffee_name"].cat.categories)
+    daily = (
+        cube.groupby(["Date", "coffee_name"], observed=True)["revenue"].sum()
+        .unstack(fill_value=0)
+        .reindex(columns=coffees, fill_value=0)
+        .asfreq("D", fill_value=0)
+    )
+    monthly = daily.resample("MS").sum()
+    if not daily.index[-1].is_month_end:
+        monthly = monthly.iloc[:-1]
+    return daily, monthly
+
+
+def extends_table(table: pd.DataFrame, fitted: pd.DataFrame, rows: int) -> bool:
+    """Whether ``table`` has the columns and first ``rows`` rows of ``fitted``, and more rows."""
+    return (
+        list(table.columns) == list(fitted.columns)
+        and len(table) > rows
+        and table.index[:rows].equals(fitted.index[:rows])
+        and np.array_equal(table.iloc[:rows].to_numpy(), fitted.iloc[:rows].to_numpy())
+    )
+
+
+class VersionedStore:
+    """Holds the latest result of a model fit on the cube, refit when the data version changes.
+
+    ``build(cube, version, base)`` returns an object with a ``version``
+    attribute; ``base`` is the previous result (or None), which the new
+    one may extend instead of starting over (as RevenueForecasts and
+    RevenueAnomalies do from their checkpoints). Shared by all sessions.
+    """
+
+    def __init__(self, build):
+        self.build = build
+        self.latest = None
+        self._lock = threading.Lock()
+
+    def get(self, version: str, load_cube):
+        """Return the result for ``version``, building it from ``load_cube()`` if it is not the latest."""
+        with self._lock:
+            if self.latest is None or self.latest.version != version:
+                self.latest = self.build(load_cube(), version, self.latest)
+            return self.latest
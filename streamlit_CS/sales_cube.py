@@ -0,0 +1,258 @@
+import datetime
+import os
+import threading
+import time
+import pandas as pd
+import streamlit as st
+from pathlib import Path
+from intraday import IntradayCounts, MINUTE_COLUMNS, append_minute_counts, build_minute_counts, combine_minute_counts
+from sales_aggregates import CubeCells, DailyTotals, VersionedStore
+from sales_data import DATA_PATH, AppendTail, data_version, map_partitions, shared_frame
+from sales_filters import SalesFilter
+
+# Seconds between checks for newly appended sales. 0 (the default) turns
+# live refresh off: the cube is then rebuilt whenever data_version changes.
+REFRESH_SECONDS = float(os.environ.get("COFFEE_SALES_REFRESH_SECONDS", "0"))
+
+# Grain of the cube. The calendar labels below depend only on Date, so
+# grouping by them as well adds no cells but keeps them available.
+CUBE_KEYS = ["Date", "hour_of_day", "coffee_name"]
+CALENDAR_COLUMNS = ["Weekday", "Weekdaysort", "Month_name", "Monthsort"]
+LABEL_COLUMNS = ["coffee_name", "Weekday", "Month_name"]
+CUBE_COLUMNS = CUBE_KEYS + CALENDAR_COLUMNS + ["money"]
+# Read by LiveCube, which keeps the minute counts current as well
+LIVE_COLUMNS = list(dict.fromkeys(CUBE_COLUMNS + MINUTE_COLUMNS))
+
+
+def build_cube(df: pd.DataFrame) -> pd.DataFrame:
+    """Aggregate transactions to one row per (Date, hour_of_day, coffee_name).
+
+    Each row holds the summed ``revenue`` and the number of ``sales`` in that
+    cell, plus the calendar labels of its Date. Rows are sorted by Date.
+    """
+    return (
+        df.groupby(CUBE_KEYS + CALENDAR_COLUMNS, observed=True)["money"]
+        .agg(revenue="sum", sales="count")
+        .reset_index()
+        .sort_values(CUBE_KEYS, ignore_index=True)
+    )
+
+
+def combine_cubes(cubes: list[pd.DataFrame]) -> pd.DataFrame:
+    """Merge cubes of separate partitions into one, summing cells they share.
+
+    Partitions of the same day (one file per store, say) overlap on Date,
+    so their cells are added up rather than concatenated.
+    """
+    if len(cubes) == 1:
+        return cubes[0]
+    cube = pd.concat(cubes, ignore_index=True)
+    # Partitions with different categories concatenate to plain strings
+    cube = cube.astype({column: "category" for column in cube if column in LABEL_COLUMNS})
+    return (
+        cube.groupby(CUBE_KEYS + CALENDAR_COLUMNS, observed=True)[["revenue", "sales"]]
+        .sum()
+        .reset_index()
+        .sort_values(CUBE_KEYS, ignore_index=True)
+    )
+
+
+def daily_sales(cube: pd.DataFrame) -> pd.DataFrame:
+    """Return total revenue and number of sales per Date of ``cube``, sorted by Date."""
+    return (
+        cube.groupby("Date")[["revenue", "sales"]]
+        .sum()
+        .reset_index()
+        .rename(columns={"revenue": "Total_Revenue", "sales": "Total_Sales"})
+    )
+
+
+def append_cube(cube: pd.DataFrame, new_cube: pd.DataFrame) -> tuple[pd.DataFrame, int]:
+    """Merge ``new_cube`` into ``cube``; return the result and how many leading rows are unchanged.
+
+    Only the days from the first new Date onwards are re-merged, which for
+    appended sales is the current day.
+    """
+    keep = int(cube["Date"].searchsorted(new_cube["Date"].iloc[0]))
+    head = cube.iloc[:keep]
+    tail = combine_cubes([cube.iloc[keep:], new_cube])
+    for column in LABEL_COLUMNS:
+        # Keep the existing categories (and so the coffee codes) when possible
+        if set(tail[column].cat.categories) <= set(head[column].cat.categories):
+            tail[column] = tail[column].cat.set_categories(head[column].cat.categories)
+    merged = pd.concat([head, tail], ignore_index=True)
+    return merged.astype({column: "category" for column in LABEL_COLUMNS}), keep
+
+
+def _summarize(df: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
+    # The cube and the minute counts of one partition's (or one append's) rows
+    return build_cube(df), build_minute_counts(df)
+
+
+class LiveCube:
+    """The cube and the tables derived from it, kept current as sales are appended.
+
+    ``refresh`` reads only what was appended to the dataset since the last
+    check (see sales_data.AppendTail), merges it into the cube with
+    ``append_cube`` and extends the shared CubeCells, so sessions keep
+    their totals (``IncrementalAggregates.rebase``); the minute counts
+    behind ``intraday`` are extended the same way. Any change other than
+    an append reloads the dataset. ``cells.version`` changes with every
+    update.
+    """
+
+    def __init__(self, path: Path = DATA_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._reload()
+
+    def _reload(self) -> None:
+        tail = AppendTail(self.path)
+        cubes, minute_counts = zip(*map_partitions(_summarize, columns=LIVE_COLUMNS, path=self.path))
+        cube, minute_counts = combine_cubes(list(cubes)), combine_minute_counts(list(minute_counts))
+        if not tail.unchanged():
+            # Sales were appended while reading; read everything through a
+            # fresh tail instead so that none are counted twice or missed
+            tail = AppendTail(self.path, from_start=True)
+            cube, minute_counts = _summarize(tail.read_appended(columns=LIVE_COLUMNS))
+        self._tail = tail
+        self._base_version = data_version(self.path, max_age=0)
+        self._generation = 0
+        self._checked = time.monotonic()
+        self.updated_at = datetime.datetime.now()
+        self.daily = daily_sales(cube)
+        self.minute_counts = minute_counts
+        self.intraday = IntradayCounts(minute_counts, self._base_version)
+        self.cells = CubeCells(SalesFilter(cube), self._base_version)
+
+    def refresh(self) -> None:
+        """Fold in the sales appended since the last check, at most once per REFRESH_SECONDS."""
+        with self._lock:
+            if time.monotonic() - self._checked < REFRESH_SECONDS:
+                return
+            self._checked = time.monotonic()
+
+            rows = self._tail.read_appended(columns=LIVE_COLUMNS)
+            if rows is None:
+                self._reload()
+                return
+            if rows.empty:
+                return
+
+            cells = self.cells
+            new_cube, new_minute_counts = _summarize(rows)
+            cube, keep = append_cube(cells.cube_filter.df, new_cube)
+            unchanged_days = self.daily[self.daily["Date"] < cube["Date"].iloc[keep]]
+            self._generation += 1
+            version = f"{self._base_version}+{self._generation}"
+            self.updated_at = datetime.datetime.now()
+            # daily and intraday first: readers take the version from cells, and
+            # a version older than the data is harmless while a newer one is not
+            self.daily = pd.concat([unchanged_days, daily_sales(cube.iloc[keep:])], ignore_index=True)
+            self.minute_counts = append_minute_counts(self.minute_counts, new_minute_counts)
+            self.intraday = IntradayCounts(self.minute_counts, version)
+            self.cells = CubeCells(SalesFilter(cube), version, cells, keep)
+
+
+@st.cache_resource(show_spinner=False)
+def get_live_cube() -> LiveCube:
+    """Return the process-wide LiveCube (live refresh mode only)."""
+    return LiveCube()
+
+
+@st.cache_resource(max_entries=1, show_spinner=False)
+def _load_cube(version: str) -> pd.DataFrame:
+    # version is only part of the cache key: a new dataset rebuilds the cube.
+    # Each partition is reduced to its own cube as it is read, so the raw
+    # rows of a large partitioned dataset are never all in memory at once.
+    return combine_cubes(map_partitions(build_cube, columns=CUBE_COLUMNS))
+
+
+def load_cube() -> pd.DataFrame:
+    """Return the cube for the current dataset, built once per process.
+
+    The data is shared between sessions: values must not be changed in
+    place, but the frame is a shallow copy (see shared_frame).
+    """
+    if REFRESH_SECONDS:
+        return shared_frame(get_live_cube().cells.cube_filter.df)
+    return shared_frame(_load_cube(data_version()))
+
+
+@st.cache_resource(max_entries=1, show_spinner=False)
+def _load_cube_cells(version: str) -> CubeCells:
+    return CubeCells(SalesFilter(_load_cube(version)), version)
+
+
+def load_cube_cells() -> CubeCells:
+    """Return the cube's dense-array cell index (see sales_aggregates.CubeCells)."""
+    if REFRESH_SECONDS:
+        return get_live_cube().cells
+    return _load_cube_cells(data_version())
+
+
+@st.cache_resource(max_entries=1, show_spinner=False)
+def _load_daily_sales(version: str) -> pd.DataFrame:
+    return daily_sales(_load_cube(version))
+
+
+def load_daily_sales() -> pd.DataFrame:
+    """Return total revenue and number of sales per Date, sorted by Date."""
+    if REFRESH_SECONDS:
+        return shared_frame(get_live_cube().daily)
+    return shared_frame(_load_daily_sales(data_version()))
+
+
+@st.cache_resource(max_entries=1, show_spinner=False)
+def _load_intraday(version: str) -> IntradayCounts:
+    # Each partition is reduced to minute counts as it is read
+    counts = combine_minute_counts(map_partitions(build_minute_counts, columns=MINUTE_COLUMNS))
+    return IntradayCounts(counts, version)
+
+
+def load_intraday() -> IntradayCounts:
+    """Return the minute-level sale counts of the current data, built once per version.
+
+    With live refresh on, appended sales are folded in by the LiveCube.
+    """
+    if REFRESH_SECONDS:
+        return get_live_cube().intraday
+    return _load_intraday(data_version())
+
+
+def cube_version() -> str:
+    """Return the version of the data behind the loaders above.
+
+    Read it before loading, so that anything cached under it is never
+    newer than the version says.
+    """
+    if REFRESH_SECONDS:
+        return get_live_cube().cells.version
+    return data_version()
+
+
+@st.cache_resource(max_entries=1, show_spinner=False)
+def _load_daily_totals(version: str, _cells: CubeCells) -> DailyTotals:
+    # Keyed by the cells' version only; _cells is not hashed
+    return DailyTotals(_cells)
+
+
+def load_daily_totals(cells: CubeCells) -> DailyTotals:
+    """Return the running daily totals of ``cells`` (see sales_aggregates.DailyTotals)."""
+    return _load_daily_totals(cells.version, cells)
+
+
+@st.cache_resource(show_spinner=False)
+def get_versioned_store(name: str, _build) -> VersionedStore:
+    # One store per name; _build is not hashed
+    return VersionedStore(_build)
+
+
+def load_versioned(name: str, build, version: str | None = None):
+    """Return ``build``'s result for ``version`` (default: cube_version()), kept in the store ``name``.
+
+    The result is refit only when the version changes, from the previous
+    one (see sales_aggregates.VersionedStore). It is shared between
+    sessions and must not be mutated.
+    """
+    return get_versioned_store(name, build).get(version if version is not None else cube_version(), load_cube)
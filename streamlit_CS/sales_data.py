@@ -0,0 +1,572 @@
+import datetime
+import hashlib
+import io
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.feather as feather
+import pyarrow.fs as pafs
+import streamlit as st
+from pathlib import Path
+
+# COFFEE_SALES_PATH points the app at another ledger with the same schema
+# (for example a synthetic one from benchmarks/synthetic.py). It may also
+# name a directory of partition files (*.csv / *.parquet, searched
+# recursively), such as one file per day and store.
+DATA_PATH = Path(
+    os.environ.get("COFFEE_SALES_PATH", Path(__file__).parent / "data" / "Coffee_sales.csv")
+)
+DATA_SUFFIXES = (".csv", ".parquet")
+
+# Bump CACHE_FORMAT whenever _parse_csv changes what it produces.
+CACHE_FORMAT = 3
+
+# Partitions are read by this many threads; Arrow releases the GIL while
+# reading and filtering.
+READ_WORKERS = int(os.environ.get("COFFEE_SALES_READ_WORKERS", min(8, os.cpu_count() or 1)))
+
+# A directory's version is a stat of every partition; within this many
+# seconds it is reused instead of walking the directory again, so the
+# loaders of one rerun share a single scan.
+VERSION_TTL_SECONDS = float(os.environ.get("COFFEE_SALES_VERSION_TTL", "1"))
+
+_MAPPED_FS = pafs.LocalFileSystem(use_mmap=True)
+
+# A partition whose path contains a date (2024-03-01.csv,
+# Date=2024-03-01/store_1.parquet, ...) holds only that day's sales, so a
+# date filter skips it without opening it.
+_PARTITION_DATE = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+# Explicit column types so the CSV is parsed once into compact dtypes
+# instead of letting pandas infer object/int64 columns on every read.
+SALES_DTYPES = {
+    "hour_of_day": "uint8",
+    "cash_type": "category",
+    "money": "float64",
+    "coffee_name": "category",
+    "Time_of_Day": "category",
+    "Weekday": "category",
+    "Month_name": "category",
+    "Weekdaysort": "int8",
+    "Monthsort": "int8",
+    "Date": "str",
+    "Time": "str",
+}
+
+
+# The columnar cache stores revenue as int32 cents and no calendar labels;
+# these columns are derived on read, from "cents" and "Date", when asked
+# for. "cents" itself can be asked for too, for exact sums, and so can
+# "seconds", the Time of day as int32 whole seconds since midnight.
+WEEKDAY_NAMES = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+MONTH_NAMES = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+DERIVED_COLUMNS = {
+    "money": "cents",
+    "Weekday": "Date",
+    "Month_name": "Date",
+    "Weekdaysort": "Date",
+    "Monthsort": "Date",
+    "seconds": "Time",
+}
+SALES_COLUMNS = list(SALES_DTYPES)
+_DURATION_UNITS = {"s": 1, "ms": 1_000, "us": 1_000_000, "ns": 1_000_000_000}
+
+
+def _normalize(df: pd.DataFrame) -> pd.DataFrame:
+    # Bring raw CSV / Parquet columns to SALES_DTYPES, Date and Time included
+    types = {
+        column: dtype
+        for column, dtype in SALES_DTYPES.items()
+        if column in df and column not in ("Date", "Time")
+    }
+    df = df.astype(types)
+    if "Date" in df and not pd.api.types.is_datetime64_any_dtype(df["Date"]):
+        df["Date"] = pd.to_datetime(df["Date"], format="%Y-%m-%d")
+    if "Time" in df and not pd.api.types.is_timedelta64_dtype(df["Time"]):
+        df["Time"] = pd.to_timedelta(df["Time"])
+    return df
+
+
+def shared_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Return a caller's handle on a cached frame that every session shares.
+
+    The handle is a shallow copy, so columns a page adds or replaces on it
+    never reach the cached frame or other sessions, on any pandas version.
+    """
+    return df.copy(deep=False)
+
+
+def _sort_by_date(df: pd.DataFrame) -> pd.DataFrame:
+    # Date order lets SalesFilter locate date ranges by binary search
+    if "Date" not in df or df["Date"].is_monotonic_increasing:
+        return df
+    keys = ["Date", "Time"] if "Time" in df else ["Date"]
+    return df.sort_values(keys, kind="stable", ignore_index=True)
+
+
+def _compact(df: pd.DataFrame) -> pd.DataFrame:
+    # The stored layout of a normalized frame (see DERIVED_COLUMNS)
+    stored = df.drop(columns=[column for column in DERIVED_COLUMNS if column in df])
+    if "money" in df:
+        stored.insert(df.columns.get_loc("money"), "cents", np.rint(df["money"].to_numpy() * 100).astype(np.int32))
+    return stored
+
+
+def _stored_columns(columns) -> list | None:
+    # Columns to read from the stored layout for the requested ``columns``
+    if not columns:
+        return None
+    return list(dict.fromkeys(DERIVED_COLUMNS.get(column, column) for column in columns))
+
+
+def _label_array(codes: pa.ChunkedArray, names: list) -> pa.ChunkedArray:
+    # Dictionary-encode 0-based codes with ``names``. The dictionary is
+    # sorted, like the categories of a parsed CSV, and the same for every
+    # partition.
+    dictionary = sorted(names)
+    codes = pc.take(pa.array([dictionary.index(name) for name in names], pa.int8()), codes)
+    dictionary = pa.array(dictionary)
+    return pa.chunked_array(
+        [pa.DictionaryArray.from_arrays(chunk, dictionary) for chunk in codes.chunks],
+        type=pa.dictionary(pa.int8(), pa.string()),
+    )
+
+
+def _derive(table: pa.Table, column: str) -> pa.ChunkedArray:
+    if column == "money":
+        return pc.divide(pc.cast(table["cents"], pa.float64()), 100.0)
+    if column == "seconds":
+        ticks = pc.cast(table["Time"], pa.int64())
+        return pc.cast(pc.divide(ticks, _DURATION_UNITS[table["Time"].type.unit]), pa.int32())
+    if column in ("Weekday", "Weekdaysort"):
+        codes, names = pc.day_of_week(table["Date"]), WEEKDAY_NAMES  # Monday is 0
+    else:
+        codes, names = pc.subtract(pc.month(table["Date"]), 1), MONTH_NAMES
+    if column.endswith("sort"):
+        return pc.cast(pc.add(codes, 1), pa.int8())
+    return _label_array(codes, names)
+
+
+def _expand(table: pa.Table, columns) -> pa.Table:
+    """Return the requested (default: all) SALES_COLUMNS of a stored-layout table."""
+    names = list(columns) if columns else SALES_COLUMNS
+    arrays = [table[name] if name in table.column_names else _derive(table, name) for name in names]
+    return pa.table(arrays, names=names)
+
+
+def _select(df: pd.DataFrame, columns) -> pd.DataFrame:
+    # The requested ``columns`` of a normalized frame, stored ones included
+    if not columns:
+        return df
+    if "cents" in columns and "cents" not in df:
+        df = df.assign(cents=np.rint(df["money"].to_numpy() * 100).astype(np.int32))
+    if "seconds" in columns and "seconds" not in df:
+        df = df.assign(seconds=(df["Time"].to_numpy() // np.timedelta64(1, "s")).astype(np.int32))
+    return df[list(columns)]
+
+
+def _complete_size(path: Path, size: int) -> int:
+    # Length of the first ``size`` bytes of ``path`` up to the end of its
+    # last complete line; what follows is a row still being written
+    with path.open("rb") as f:
+        end = size
+        while end > 0:
+            start = max(end - 65536, 0)
+            f.seek(start)
+            newline = f.read(end - start).rfind(b"\n")
+            if newline >= 0:
+                return start + newline + 1
+            end = start
+    return 0
+
+
+def _parse_csv(path: Path) -> pd.DataFrame:
+    size = path.stat().st_size
+    complete = _complete_size(path, size)
+    if complete == size:
+        df = pd.read_csv(path, dtype=SALES_DTYPES)
+    else:
+        # Leave out the row still being written, as AppendTail does
+        with path.open("rb") as f:
+            df = pd.read_csv(io.BytesIO(f.read(complete)), dtype=SALES_DTYPES)
+    df = _normalize(df)
+    return df.sort_values(["Date", "Time"], kind="stable", ignore_index=True)
+
+
+def dataset_files(path: Path = DATA_PATH) -> list[Path]:
+    """Return the data files of the dataset at ``path`` (a file or a directory)."""
+    if not path.is_dir():
+        return [path]
+    files = sorted(
+        file
+        for file in path.rglob("*")
+        if file.suffix in DATA_SUFFIXES
+        and not any(part.startswith(".") for part in file.relative_to(path).parts)
+    )
+    if not files:
+        raise FileNotFoundError(f"No {' or '.join(DATA_SUFFIXES)} files under {path}")
+    return files
+
+
+def cache_dir(root: Path = DATA_PATH) -> Path:
+    """Return the directory for files derived from the dataset at ``root``, such as columnar copies of its CSVs."""
+    return (root if root.is_dir() else root.parent) / ".cache"
+
+
+# Derived files of the app's own dataset
+CACHE_DIR = cache_dir(DATA_PATH)
+
+
+def _cache_stem(path: Path, root: Path) -> str:
+    # Partitions are named by their path below the dataset directory so that
+    # store_1/2024-03-01.csv and store_2/2024-03-01.csv get separate caches.
+    if root.is_dir():
+        return "~".join(path.relative_to(root).with_suffix("").parts)
+    return path.stem
+
+
+def columnar_cache_path(path: Path = DATA_PATH, root: Path | None = None) -> Path:
+    """Return the Arrow IPC cache file for the current version of the CSV ``path``.
+
+    ``root`` is the dataset ``path`` belongs to (default: ``path`` itself);
+    the file lives in its ``cache_dir``. The name embeds the CSV's size and
+    mtime, so any change to the CSV points at a new cache file and the old
+    one is rebuilt on first use.
+    """
+    root = path if root is None else root
+    stat = path.stat()
+    return cache_dir(root) / f"{_cache_stem(path, root)}-{stat.st_size}-{stat.st_mtime_ns}-v{CACHE_FORMAT}.arrow"
+
+
+def _build_columnar_cache(path: Path, root: Path, cache_path: Path) -> None:
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    # Thread id too: partitions are built concurrently by the read pool.
+    tmp_path = cache_path.with_suffix(f".{os.getpid()}-{threading.get_ident()}.tmp")
+    # Uncompressed IPC so the file can be memory-mapped without decoding.
+    feather.write_feather(_compact(_parse_csv(path)), tmp_path, compression="uncompressed")
+    os.replace(tmp_path, cache_path)
+
+    # Older versions of this file only: the whole stem must match
+    stem = _cache_stem(path, root)
+    versions = re.compile(rf"{re.escape(stem)}-\d+-\d+-v\d+\.arrow")
+    for stale in cache_path.parent.glob("*.arrow"):
+        if stale != cache_path and versions.fullmatch(stale.name):
+            stale.unlink(missing_ok=True)
+
+
+def _partition_date(path: Path) -> datetime.date | None:
+    for match in reversed(_PARTITION_DATE.findall(str(path))):
+        try:
+            return datetime.date.fromisoformat(match)
+        except ValueError:
+            continue
+    return None
+
+
+def _predicate(schema: pa.Schema, date_range, coffees):
+    # Arrow filter expression for the pushed-down filters, or None
+    predicate = None
+    if date_range is not None:
+        start, end = (pd.Timestamp(day) for day in date_range)
+        if pa.types.is_string(schema.field("Date").type) or pa.types.is_large_string(schema.field("Date").type):
+            start, end = start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")
+            predicate = (ds.field("Date") >= start) & (ds.field("Date") <= end)
+        else:
+            predicate = (ds.field("Date") >= start) & (ds.field("Date") < end + pd.Timedelta(days=1))
+    if coffees is not None:
+        coffees = list(coffees)
+        # isin() cannot infer the type of an empty value set; no coffees means no rows
+        coffee_match = ds.field("coffee_name").isin(coffees) if coffees else ds.scalar(False)
+        predicate = coffee_match if predicate is None else predicate & coffee_match
+    return predicate
+
+
+def _parquet_source(stored) -> list | None:
+    # Parquet partitions have the CSV's columns: money rather than cents
+    if not stored:
+        return None
+    return list(dict.fromkeys(DERIVED_COLUMNS.get(c, c) if c != "cents" else "money" for c in stored))
+
+
+def _from_parquet(table: pa.Table, columns) -> pa.Table:
+    return _expand(pa.Table.from_pandas(_compact(_normalize(table.to_pandas())), preserve_index=False), columns)
+
+
+def _csv_cache(path: Path, root: Path) -> Path:
+    # The columnar cache of the CSV ``path`` of the dataset ``root``, built on first use
+    cache_path = columnar_cache_path(path, root)
+    if not cache_path.exists():
+        _build_columnar_cache(path, root, cache_path)
+    return cache_path
+
+
+def _read_partition(path: Path, root: Path, columns, date_range, coffees) -> pa.Table:
+    """Read the ``columns`` of one data file of the dataset ``root`` as an Arrow table in the SALES_DTYPES layout.
+
+    CSV files go through their memory-mapped columnar cache. Parquet files
+    are read directly, and the filter lets Arrow skip row groups whose
+    statistics rule them out.
+    """
+    stored = _stored_columns(columns)
+    if path.suffix == ".parquet":
+        dataset = ds.dataset(path, format="parquet")
+        table = dataset.to_table(
+            columns=_parquet_source(stored),
+            filter=_predicate(dataset.schema, date_range, coffees),
+        )
+        return _from_parquet(table, columns)
+
+    cache_path = _csv_cache(path, root)
+    if date_range is None and coffees is None:
+        table = feather.read_table(cache_path, columns=stored, memory_map=True)
+    else:
+        dataset = ds.dataset(cache_path, format="ipc")
+        table = dataset.to_table(columns=stored, filter=_predicate(dataset.schema, date_range, coffees))
+    return _expand(table, columns)
+
+
+def _partition_batches(path: Path, root: Path, columns, date_range, coffees, batch_rows: int):
+    # _read_partition as a stream of tables of at most batch_rows rows
+    stored = _stored_columns(columns)
+    if path.suffix == ".parquet":
+        dataset = ds.dataset(path, format="parquet")
+        predicate = _predicate(dataset.schema, date_range, coffees)
+        # Parquet row groups are still pruned by their statistics
+        batches = dataset.to_batches(columns=_parquet_source(stored), filter=predicate, batch_size=batch_rows)
+        for batch in batches:
+            if batch.num_rows:
+                yield _from_parquet(pa.Table.from_batches([batch]), columns)
+        return
+
+    # The cache file is memory-mapped and each batch filtered on its own; a
+    # filtered scan would hold the whole file's matching rows at once
+    dataset = ds.dataset(str(_csv_cache(path, root)), format="ipc", filesystem=_MAPPED_FS)
+    predicate = _predicate(dataset.schema, date_range, coffees)
+    if stored is not None:
+        # The filtered columns are read as well, then left out by _expand
+        stored = list(dict.fromkeys(
+            stored + ["Date"] * (date_range is not None) + ["coffee_name"] * (coffees is not None)
+        ))
+    for batch in dataset.to_batches(columns=stored, batch_size=batch_rows):
+        table = pa.Table.from_batches([batch])
+        if predicate is not None:
+            table = table.filter(predicate)
+        if table.num_rows:
+            yield _expand(table, columns)
+
+
+def _candidate_files(path: Path, date_range) -> list[Path]:
+    # The data files that may hold rows in date_range
+    files = dataset_files(path)
+    if date_range is None:
+        return files
+    start, end = date_range
+    in_range = [
+        file for file in files
+        if (day := _partition_date(file.relative_to(path) if path.is_dir() else file)) is None
+        or start <= day <= end
+    ]
+    # Keep one file when nothing matches so the result still has its columns
+    return in_range or files[:1]
+
+
+def _map_files(func, columns, date_range, coffees, path: Path) -> list:
+    files = _candidate_files(path, date_range)
+
+    def read(file):
+        return func(_read_partition(file, path, columns, date_range, coffees))
+
+    if len(files) == 1:
+        return [read(files[0])]
+    with ThreadPoolExecutor(max_workers=min(READ_WORKERS, len(files))) as pool:
+        return list(pool.map(read, files))
+
+
+def map_partitions(func, columns=None, date_range=None, coffees=None, path: Path = DATA_PATH) -> list:
+    """Return ``[func(frame), ...]`` for the frame of every data file that may match.
+
+    ``date_range`` (inclusive dates) and ``coffees`` are pushed down: files
+    dated outside the range are never opened and only matching rows are
+    converted to pandas. Files are handled in parallel by READ_WORKERS
+    threads, so ``func`` should build a small summary of its frame.
+    """
+    return _map_files(lambda table: func(table.to_pandas()), columns, date_range, coffees, path)
+
+
+def iter_sales_chunks(columns=None, chunk_rows: int = 100_000, date_range=None, coffees=None, path: Path = DATA_PATH):
+    """Yield the rows matching ``date_range`` and ``coffees`` as frames of at most ``chunk_rows`` rows.
+
+    The filters are pushed down as in ``read_sales``, but files are read
+    one record batch at a time, so memory stays bounded however many rows
+    match. Rows come file by file, each file's in Date order. At least one
+    (possibly empty) frame is yielded, so consumers always see the columns.
+    """
+    files = _candidate_files(path, date_range)
+    empty = True
+    for file in files:
+        for table in _partition_batches(file, path, columns, date_range, coffees, chunk_rows):
+            empty = False
+            yield table.to_pandas()
+    if empty:
+        yield _read_partition(files[0], path, columns, None, []).to_pandas()
+
+
+def read_sales(columns=None, date_range=None, coffees=None, path: Path = DATA_PATH) -> pd.DataFrame:
+    """Return the rows matching ``date_range`` and ``coffees``, sorted by Date.
+
+    Unlike ``load_sales`` the result is not cached; the filters are pushed
+    down as in ``map_partitions``, so a one-week read of a large
+    partitioned dataset only touches that week's files.
+    """
+    tables = _map_files(lambda table: table, columns, date_range, coffees, path)
+    if len(tables) == 1:
+        return tables[0].to_pandas()
+
+    df = pa.concat_tables(tables, promote_options="permissive").to_pandas()
+    for column in df.select_dtypes("category"):
+        # Partitions contribute categories in file order; keep them sorted
+        # like a single parsed file would.
+        df[column] = df[column].cat.reorder_categories(sorted(df[column].cat.categories))
+    return _sort_by_date(df)
+
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def _read_sales(path: str, version: str, columns: tuple | None) -> pd.DataFrame:
+    # version changes with the data files' sizes/mtimes, invalidating this entry.
+    return read_sales(columns, path=Path(path))
+
+
+_versions = {}
+_versions_lock = threading.Lock()
+
+
+def data_version(path: Path = DATA_PATH, max_age: float = VERSION_TTL_SECONDS) -> str:
+    """Return an identifier that changes whenever the dataset at ``path`` changes.
+
+    For a directory the identifier may be up to ``max_age`` seconds old;
+    pass 0 to scan the partitions now.
+    """
+    if not path.is_dir():
+        return columnar_cache_path(path).stem
+    now = time.monotonic()
+    with _versions_lock:
+        scanned_at, version = _versions.get(path, (None, None))
+        if scanned_at is not None and now - scanned_at < max_age:
+            return version
+    digest = hashlib.blake2b(digest_size=8)
+    for file in dataset_files(path):
+        stat = file.stat()
+        digest.update(f"{file.relative_to(path)}|{stat.st_size}|{stat.st_mtime_ns}\n".encode())
+    version = f"{path.name}-{digest.hexdigest()}-v{CACHE_FORMAT}"
+    with _versions_lock:
+        _versions[path] = (now, version)
+    return version
+
+
+def load_sales(columns=None, path: Path = DATA_PATH) -> pd.DataFrame:
+    """Return the sales dataset, parsed once per process and shared by every page.
+
+    ``columns`` limits the frame to the listed columns; only those are read
+    from the columnar cache. Besides SALES_COLUMNS it may list "cents",
+    revenue as int32 cents; calendar labels and ``money`` asked for are
+    derived from the stored Date and cents. The data is cached and shared between reruns
+    and sessions; the frame returned is a shallow copy (see shared_frame),
+    so columns may be added or replaced, but values must never be changed
+    in place. For a CSV dataset its numeric columns
+    point into the memory-mapped cache file, so server processes on the
+    same host share those pages instead of each holding a copy.
+    """
+    columns = tuple(columns) if columns is not None else None
+    return shared_frame(_read_sales(str(path), data_version(path), columns))
+
+
+class AppendTail:
+    """Reads the rows appended to the dataset at ``path`` since the last read.
+
+    CSV files are followed by byte offset, so only their new complete lines
+    are parsed; files that appear in a partition directory are read whole.
+    On construction the dataset as it is now counts as read, up to the last
+    complete line of each CSV (as in the full read), unless ``from_start``
+    is set.
+    """
+
+    # Bytes before each offset that must be unchanged for the file to count
+    # as appended to rather than rewritten
+    _GUARD_BYTES = 64
+
+    def __init__(self, path: Path = DATA_PATH, from_start: bool = False):
+        self.path = path
+        self._files = {}
+        if not from_start:
+            for file, stat in self._stat().items():
+                offset = _complete_size(file, stat.st_size) if file.suffix == ".csv" else stat.st_size
+                self._files[file] = (stat, offset, self._guard(file, offset))
+
+    def _stat(self) -> dict:
+        return {file: file.stat() for file in dataset_files(self.path)}
+
+    def _guard(self, file: Path, offset: int) -> bytes:
+        if file.suffix != ".csv":
+            return b""
+        with file.open("rb") as f:
+            f.seek(max(offset - self._GUARD_BYTES, 0))
+            return f.read(min(offset, self._GUARD_BYTES))
+
+    def unchanged(self) -> bool:
+        """Whether no file was added, removed or modified since the last read."""
+        stats = self._stat()
+        return stats.keys() == self._files.keys() and all(
+            (stat.st_size, stat.st_mtime_ns) == (self._files[file][0].st_size, self._files[file][0].st_mtime_ns)
+            for file, stat in stats.items()
+        )
+
+    def read_appended(self, columns=None) -> pd.DataFrame | None:
+        """Return the rows added since the last read (possibly none), sorted by Date.
+
+        Returns ``None`` when the dataset changed in a way other than rows or
+        files being appended (a file shrank, was rewritten or removed, or a
+        Parquet file changed); the caller must then reload it in full.
+        """
+        stats = self._stat()
+        if not self._files.keys() <= stats.keys():
+            return None
+
+        frames = []
+        for file, stat in stats.items():
+            known = self._files.get(file)
+            if known is not None and (stat.st_size, stat.st_mtime_ns) == (known[0].st_size, known[0].st_mtime_ns):
+                continue
+            if known is None and file.suffix == ".parquet":
+                frames.append(_select(_normalize(pd.read_parquet(file)), columns))
+                self._files[file] = (stat, stat.st_size, b"")
+                continue
+            offset = known[1] if known else 0
+            if file.suffix != ".csv" or stat.st_size < offset or self._guard(file, offset) != (known[2] if known else b""):
+                return None
+
+            with file.open("rb") as f:
+                header = f.readline()
+                f.seek(offset)
+                data = f.read(stat.st_size - offset)
+            # Only complete lines; a row still being written is read next time
+            data = data[:data.rfind(b"\n") + 1]
+            if offset == 0:
+                data = data[len(header):]
+            if data:
+                names = pd.read_csv(io.BytesIO(header), nrows=0).columns
+                rows = pd.read_csv(io.BytesIO(data), header=None, names=names, dtype=SALES_DTYPES)
+                frames.append(_select(_normalize(rows), columns))
+            offset += len(data) + (len(header) if offset == 0 and data else 0)
+            self._files[file] = (stat, offset, self._guard(file, offset))
+
+        if not frames:
+            return pd.DataFrame()
+        # Files contribute different categories; normalizing again unifies them
+        return _sort_by_date(_normalize(pd.concat(frames, ignore_index=True)))
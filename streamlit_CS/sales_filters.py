@@ -0,0 +1,82 @@
+import datetime
+import numpy as np
+import pandas as pd
+
+
+class SalesFilter:
+    """Date / hour / coffee filter over a frame sorted by ``Date``.
+
+    The date range is located with a binary search on the datetime64 column
+    and returned as a positional slice. Hour and coffee filters are answered
+    with lookup tables indexed by ``hour_of_day`` and the ``coffee_name``
+    category codes, combined into one mask over that slice, so a filtered
+    frame costs a single copy. Columns that are missing from the frame are
+    not filterable; passing a filter for them raises ``KeyError``.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self._dates = df["Date"].to_numpy()
+        if len(self._dates) > 1 and (self._dates[1:] < self._dates[:-1]).any():
+            raise ValueError("SalesFilter needs a frame sorted by Date.")
+
+        self._hours = df["hour_of_day"].to_numpy() if "hour_of_day" in df else None
+        if "coffee_name" in df:
+            coffee = df["coffee_name"].astype("category")
+            self.coffee_types = list(coffee.cat.categories)
+            self._coffee_codes = coffee.cat.codes.to_numpy()
+        else:
+            self.coffee_types = []
+            self._coffee_codes = None
+
+    def date_slice(self, start_date: datetime.date, end_date: datetime.date) -> slice:
+        """Return the positional slice of rows whose Date lies in [start_date, end_date]."""
+        unit = self._dates.dtype
+        lo = np.datetime64(start_date, "D").astype(unit)
+        hi = (np.datetime64(end_date, "D") + 1).astype(unit)
+        start = int(np.searchsorted(self._dates, lo, side="left"))
+        stop = int(np.searchsorted(self._dates, hi, side="left"))
+        return slice(start, stop)
+
+    def row_selection(
+        self,
+        date_range: tuple[datetime.date, datetime.date] | None = None,
+        hour_range: tuple[int, int] | None = None,
+        coffees=None,
+    ) -> tuple[slice, np.ndarray | None]:
+        """Return (slice, mask) selecting the matching rows.
+
+        ``mask`` applies to the rows inside ``slice`` and is ``None`` when
+        every row of the slice matches. ``coffees=None`` keeps all coffee
+        types; an empty collection keeps none.
+        """
+        rows = self.date_slice(*date_range) if date_range else slice(0, len(self._dates))
+        mask = None
+
+        if hour_range is not None:
+            if self._hours is None:
+                raise KeyError("hour_of_day")
+            start_hour, end_hour = hour_range
+            keep_hour = np.zeros(256, dtype=bool)
+            keep_hour[max(start_hour, 0):end_hour + 1] = True
+            mask = keep_hour[self._hours[rows].astype(np.intp, copy=False)]
+
+        if coffees is not None:
+            if self._coffee_codes is None:
+                raise KeyError("coffee_name")
+            # One extra False slot so missing values (code -1) never match.
+            keep_coffee = np.append(np.isin(self.coffee_types, list(coffees)), False)
+            coffee_mask = keep_coffee[self._coffee_codes[rows]]
+            mask = coffee_mask if mask is None else mask & coffee_mask
+
+        if mask is not None and mask.all():
+            mask = None
+        return rows, mask
+
+    def apply(self, date_range=None, hour_range=None, coffees=None) -> pd.DataFrame:
+        """Return the rows matching the filters (see ``row_selection``)."""
+        rows, mask = self.row_selection(date_range, hour_range, coffees)
+        selected = self.df.iloc[rows]
+        if mask is not None:
+            selected = selected[mask]
+        return selected
@@ -0,0 +1,291 @@
+"""Optional SQL engine behind the Dashboard's aggregations.
+
+``COFFEE_SALES_BACKEND=sqlite`` or ``=duckdb`` loads the transactions into
+a local database file next to the columnar cache, one file per data
+version. The Dashboard's KPIs and charts are then answered by SQL queries
+with the sidebar filters as parameters. These are parallel in DuckDB and
+never need the whole dataset in memory. The default, ``pandas``, keeps
+the in-memory cube path (sales_aggregates).
+
+With live refresh on (COFFEE_SALES_REFRESH_SECONDS), appended sales are
+inserted into the database rather than rebuilding it. The in-memory cube
+is still loaded either way: the sidebar, the previous-period deltas, the
+rolling chart, the intraday section and the forecasts are answered from
+it (and from the minute counts), not from SQL.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from sales_cube import REFRESH_SECONDS
+from sales_data import CACHE_DIR, AppendTail, data_version, iter_sales_chunks
+
+try:
+    import duckdb
+except ImportError:  # only needed for COFFEE_SALES_BACKEND=duckdb
+    duckdb = None
+
+QUERY_BACKEND = os.environ.get("COFFEE_SALES_BACKEND", "pandas")
+SQL_ENGINES = ("sqlite", "duckdb")
+
+# Calendar fields are stored precomputed so that queries never parse dates;
+# revenue is kept in cents so that sums are exact.
+SALES_TABLE = """
+CREATE TABLE sales (
+    sale_date TEXT,
+    year INTEGER,
+    month_sort INTEGER,
+    month_name TEXT,
+    weekday_sort INTEGER,
+    weekday TEXT,
+    hour INTEGER,
+    coffee_name TEXT,
+    cents BIGINT
+)
+"""
+SOURCE_COLUMNS = ["Date", "Monthsort", "Month_name", "Weekdaysort", "Weekday", "hour_of_day", "coffee_name", "cents"]
+
+
+def _table_rows(chunk: pd.DataFrame) -> pd.DataFrame:
+    return pd.DataFrame({
+        "sale_date": chunk["Date"].dt.strftime("%Y-%m-%d"),
+        "year": chunk["Date"].dt.year.astype(np.int64),
+        "month_sort": chunk["Monthsort"].astype(np.int64),
+        "month_name": chunk["Month_name"].astype(str),
+        "weekday_sort": chunk["Weekdaysort"].astype(np.int64),
+        "weekday": chunk["Weekday"].astype(str),
+        "hour": chunk["hour_of_day"].astype(np.int64),
+        "coffee_name": chunk["coffee_name"].astype(str),
+        "cents": chunk["cents"].to_numpy(np.int64),
+    })
+
+
+def _insert_rows(engine: str, con, chunk: pd.DataFrame) -> None:
+    rows = _table_rows(chunk)
+    if engine == "duckdb":
+        con.register("chunk_rows", rows)
+        con.execute("INSERT INTO sales SELECT * FROM chunk_rows")
+        con.unregister("chunk_rows")
+    else:
+        rows.to_sql("sales", con, if_exists="append", index=False)
+
+
+def _build_database(engine: str, db_path: Path, chunks) -> None:
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = db_path.with_suffix(f".{os.getpid()}.tmp")
+    tmp_path.unlink(missing_ok=True)
+
+    # Loaded chunk by chunk, so memory stays bounded whatever the dataset size
+    if engine == "duckdb":
+        with duckdb.connect(str(tmp_path)) as con:
+            con.execute(SALES_TABLE)
+            for chunk in chunks:
+                if len(chunk):
+                    _insert_rows(engine, con, chunk)
+    else:
+        with closing(sqlite3.connect(tmp_path)) as con:
+            con.execute(SALES_TABLE)
+            for chunk in chunks:
+                if len(chunk):
+                    _insert_rows(engine, con, chunk)
+            con.execute("CREATE INDEX sales_by_date ON sales (sale_date, hour)")
+            con.commit()
+    os.replace(tmp_path, db_path)
+
+    for stale in db_path.parent.glob(f"*.{engine}"):
+        if stale != db_path:
+            stale.unlink(missing_ok=True)
+
+
+class SqlBackend:
+    """A local SQLite or DuckDB copy of the transactions, queried per filter state."""
+
+    def __init__(self, engine: str, db_path: Path, version: str, writable: bool = False):
+        self.engine = engine
+        self.version = version
+        self.db_path = db_path
+        # DuckDB: one connection (read-only unless rows are appended), with a
+        # cursor per query so that sessions can query from their own threads.
+        self._con = duckdb.connect(str(db_path), read_only=not writable) if engine == "duckdb" else None
+
+    def query(self, sql: str, params: list) -> pd.DataFrame:
+        if self._con is not None:
+            with self._con.cursor() as cursor:
+                return cursor.execute(sql, params).df()
+        with closing(sqlite3.connect(self.db_path)) as con:
+            return pd.read_sql_query(sql, con, params=params)
+
+    def append(self, chunk: pd.DataFrame, version: str) -> None:
+        """Insert the transactions in ``chunk`` (SOURCE_COLUMNS); later queries see them as ``version``."""
+        if self._con is not None:
+            with self._con.cursor() as cursor:
+                _insert_rows(self.engine, cursor, chunk)
+        else:
+            with closing(sqlite3.connect(self.db_path)) as con:
+                _insert_rows(self.engine, con, chunk)
+                con.commit()
+        # Only after the rows are in: a version older than the data is harmless
+        self.version = version
+
+    def select(self, date_range, hour_range, coffees) -> "SqlSelection":
+        """Return the Dashboard tables for one filter state (see SqlSelection)."""
+        return SqlSelection(self, date_range, hour_range, coffees)
+
+
+@st.cache_resource(max_entries=1, show_spinner=False)
+def _load_backend(engine: str, version: str) -> SqlBackend:
+    db_path = CACHE_DIR / f"{version}.{engine}"
+    if not db_path.exists():
+        _build_database(engine, db_path, iter_sales_chunks(SOURCE_COLUMNS))
+    return SqlBackend(engine, db_path, version)
+
+
+class LiveSqlBackend:
+    """The SQL backend in live refresh mode, following the dataset as LiveCube does.
+
+    The database is built once; ``refresh`` inserts the rows appended since
+    (read through an AppendTail) and any other change rebuilds it.
+    ``backend.version`` changes with every insert.
+    """
+
+    def __init__(self, engine: str):
+        self.engine = engine
+        self._lock = threading.Lock()
+        self._reload()
+
+    def _reload(self) -> None:
+        tail = AppendTail()
+        version = data_version(max_age=0)
+        # Its own name: the rows inserted later make it differ from a
+        # static build of the same version
+        db_path = CACHE_DIR / f"{version}.live.{self.engine}"
+        _build_database(self.engine, db_path, iter_sales_chunks(SOURCE_COLUMNS))
+        if not tail.unchanged():
+            # Sales were appended while loading; load everything through a
+            # fresh tail instead so that none are counted twice or missed
+            tail = AppendTail(from_start=True)
+            _build_database(self.engine, db_path, [tail.read_appended(columns=SOURCE_COLUMNS)])
+        self._tail = tail
+        self._base_version = version
+        self._generation = 0
+        self._checked = time.monotonic()
+        self.backend = SqlBackend(self.engine, db_path, version, writable=True)
+
+    def refresh(self) -> None:
+        """Insert the sales appended since the last check, at most once per REFRESH_SECONDS."""
+        with self._lock:
+            if time.monotonic() - self._checked < REFRESH_SECONDS:
+                return
+            self._checked = time.monotonic()
+
+            rows = self._tail.read_appended(columns=SOURCE_COLUMNS)
+            if rows is None:
+                self._reload()
+            elif not rows.empty:
+                self._generation += 1
+                self.backend.append(rows, f"{self._base_version}+{self._generation}")
+
+
+@st.cache_resource(show_spinner=False)
+def get_live_backend(engine: str) -> LiveSqlBackend:
+    """Return the process-wide LiveSqlBackend for ``engine`` (live refresh mode only)."""
+    return LiveSqlBackend(engine)
+
+
+def load_query_backend() -> SqlBackend | None:
+    """Return the SQL backend chosen by COFFEE_SALES_BACKEND, or None for pandas."""
+    if QUERY_BACKEND == "pandas":
+        return None
+    if QUERY_BACKEND not in SQL_ENGINES:
+        raise ValueError(f"COFFEE_SALES_BACKEND must be pandas, sqlite or duckdb, not {QUERY_BACKEND!r}")
+    if QUERY_BACKEND == "duckdb" and duckdb is None:
+        raise ImportError("COFFEE_SALES_BACKEND=duckdb needs the duckdb package (pip install duckdb)")
+    if REFRESH_SECONDS:
+        live = get_live_backend(QUERY_BACKEND)
+        live.refresh()
+        return live.backend
+    return _load_backend(QUERY_BACKEND, data_version())
+
+
+class SqlSelection:
+    """The AggregateView tables for one filter state, answered with SQL.
+
+    The totals are queried up front. Each table is queried when it is
+    asked for, which happens only when a chart is not in the figure cache.
+    """
+
+    def __init__(self, backend: SqlBackend, date_range, hour_range, coffees):
+        self._backend = backend
+        start_date, end_date = date_range
+        self._start_hour, self._end_hour = max(hour_range[0], 0), hour_range[1]
+        coffees = list(coffees)
+        # An empty coffee selection keeps nothing, as in the pandas path
+        coffee_clause = f"coffee_name IN ({', '.join('?' * len(coffees))})" if coffees else "1 = 0"
+        self._where = f"sale_date BETWEEN ? AND ? AND hour BETWEEN ? AND ? AND {coffee_clause}"
+        self._params = [start_date.isoformat(), end_date.isoformat(), self._start_hour, self._end_hour, *coffees]
+
+        totals = self._query("SELECT COALESCE(SUM(cents), 0) AS cents, COUNT(*) AS sales FROM sales WHERE {where}")
+        self.total_revenue = int(totals["cents"].iloc[0]) / 100
+        self.total_sales = int(totals["sales"].iloc[0])
+        self.empty = self.total_sales == 0
+
+    def _query(self, sql: str) -> pd.DataFrame:
+        return self._backend.query(sql.format(where=self._where), self._params)
+
+    def revenue_by_weekday_hour(self) -> pd.DataFrame:
+        """Weekday x hour revenue table, limited to the weekdays and hours with sales."""
+        cells = self._query(
+            "SELECT weekday_sort, weekday, hour, SUM(cents) AS cents FROM sales "
+            "WHERE {where} GROUP BY weekday_sort, weekday, hour"
+        )
+        table = cells.pivot_table(
+            index=["weekday_sort", "weekday"], columns="hour", values="cents", aggfunc="sum", fill_value=0
+        )
+        table = table.droplevel("weekday_sort").sort_index(axis=1) / 100
+        table.index.name, table.columns.name = "Weekday", "hour_of_day"
+        return table.astype(np.float64)
+
+    def revenue_by_coffee(self) -> pd.DataFrame:
+        coffee = self._query(
+            "SELECT coffee_name, SUM(cents) AS cents FROM sales "
+            "WHERE {where} GROUP BY coffee_name ORDER BY coffee_name"
+        )
+        return pd.DataFrame({
+            "coffee_name": coffee["coffee_name"].to_numpy(dtype=object),
+            "money": coffee["cents"].to_numpy(np.int64) / 100,
+        })
+
+    def revenue_by_month(self) -> pd.DataFrame:
+        """Year-aware monthly revenue, in calendar order."""
+        monthly = self._query(
+            "SELECT year, month_sort, month_name, SUM(cents) AS cents FROM sales "
+            "WHERE {where} GROUP BY year, month_sort, month_name ORDER BY year, month_sort"
+        )
+        return pd.DataFrame({
+            "Year": monthly["year"].to_numpy(np.int64),
+            "Monthsort": monthly["month_sort"].to_numpy(np.int64),
+            "Month_name": monthly["month_name"].to_numpy(dtype=object),
+            "total_revenue": monthly["cents"].to_numpy(np.int64) / 100,
+        })
+
+    def hour_counts_by_month(self) -> pd.DataFrame:
+        """Number of sales per hour of day (columns) for each Month_name (rows, calendar order)."""
+        counts = self._query(
+            "SELECT month_sort, month_name, hour, COUNT(*) AS sales FROM sales "
+            "WHERE {where} GROUP BY month_sort, month_name, hour"
+        )
+        table = counts.pivot_table(
+            index=["month_sort", "month_name"], columns="hour", values="sales", aggfunc="sum", fill_value=0
+        )
+        table = table.reindex(columns=range(self._start_hour, self._end_hour + 1), fill_value=0)
+        table = table.droplevel("month_sort").astype(np.int64)
+        table.index.name, table.columns.name = "Month_name", None
+        return table